@@ -1,7 +1,8 @@
 import csv
 import itertools
 import sys
-import copy
+
+from network import inheritance_table, marginals
 
 PROBS = {
 
@@ -37,53 +38,37 @@ PROBS = {
     "mutation": 0.01
 }
 
+# PROBS as lookup tables: GENE[genes] for a person without known parents,
+# INHERITANCE[mother genes][father genes][genes] otherwise, and
+# TRAIT[genes][has trait]
+GENE = [PROBS["gene"][genes] for genes in range(3)]
+INHERITANCE = inheritance_table(PROBS["mutation"])
+TRAIT = [
+    [PROBS["trait"][genes][False], PROBS["trait"][genes][True]]
+    for genes in range(3)
+]
+
+# Largest difference from enumeration that `--check` accepts
+CHECK_TOLERANCE = 1e-9
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    if len(sys.argv) < 2 or sys.argv[2:] not in ([], ["--check"]):
+        sys.exit("Usage: python heredity.py data.csv [--check]")
     people = load_data(sys.argv[1])
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
-        person: {
-            "gene": {
-                2: 0,
-                1: 0,
-                0: 0
-            },
-            "trait": {
-                True: 0,
-                False: 0
-            }
-        }
-        for person in people
-    }
-
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
+    # Compute gene and trait probabilities for each person by exact
+    # inference on the pedigree, instead of enumerating every combination
+    probabilities = marginals(people, PROBS)
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
-
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
+    # Cross-check against enumerating every combination, if asked
+    if len(sys.argv) == 3:
+        difference = compare(probabilities, enumerate_probabilities(people))
+        if difference > CHECK_TOLERANCE:
+            sys.exit(f"Enumeration differs by {difference:.2e}")
+        print(f"Enumeration agrees within {CHECK_TOLERANCE}")
 
     # Print results
     for person in people:
@@ -140,415 +125,87 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
+    genes = {
+        person: 2 if person in two_genes else 1 if person in one_gene else 0
+        for person in people
+    }
 
     probability = 1
+    for person, data in people.items():
+        count = genes[person]
 
-    for person in people:
-        # Person without known parents (assumed if no mom --> no dad).
-        if people[person]['mother'] is None:
-            if person in one_gene:
-                if person in have_trait:
-                    # ✔ one_gene.
-                    # ✔ have_trait.
-                    # no parents
-                    probability *= PROBS["gene"][1] * PROBS["trait"][1][True]
-                else:
-                    # ✔ one_gene set.
-                    # X have_trait.
-                    # no parents
-                    probability *= PROBS["gene"][1] * PROBS["trait"][1][False]
-            elif person in two_genes:
-                if person in have_trait:
-                    # ✔ two_gene.
-                    # ✔ have_trait.
-                    # no parents
-                    probability *= PROBS["gene"][2] * PROBS["trait"][2][True]
-                else:
-                    # ✔ two_gene.
-                    # X have_trait.
-                    # no parents
-                    probability *= PROBS["gene"][2] * PROBS["trait"][2][False]
-            else:
-                if person not in have_trait:
-                    # X one_gene
-                    # X two_genes sets
-                    # X have_trait.
-                    # no parents
-                    probability *= PROBS["gene"][0] * PROBS["trait"][0][False]
-        # Person with known parents.
+        # Person without known parents (assumed if no mom --> no dad)
+        if data["mother"] is None:
+            probability *= GENE[count]
         else:
-            parents = [
-                people[person]["mother"],
-                people[person]["father"]
-            ]
-            parents = find_parents(parents, one_gene, two_genes)
-            # M --> mother.
-            # F -->father
-            if person in one_gene:
-                if parents.count(0) == 2:
-                    if person in have_trait:
-                        """
-                        ***
-                         ✔ one_gene.
-                         ✔ have_trait.
-                         0M, 0F
-                         """
-                        probability *= 2 * ((1 - PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][1][True]
-                    else:
-                        """
-                        ***
-                         ✔ one_gene.
-                         X have_trait.
-                         0M - 0D
-                        """
-                        probability *= 2 * ((1 - PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][1][False]
-                elif parents.count(0) == 1 and parents.count(1) == 1:
-                    if person in have_trait:
-                        """
-                        ***
-                         ✔ one_gene.
-                         ✔ have_trait.
-                         1M - 0F v 0M - 1F
-                        """
-                        cases =  (0.5 * PROBS["mutation"]) *  PROBS["mutation"]
-                        cases += (0.5 * (1 - PROBS["mutation"])) * (1 - PROBS["mutation"])
-                        cases += (0.5 * PROBS["mutation"]) * (1 - PROBS["mutation"])
-                        cases += (0.5 * (1 - PROBS["mutation"])) * PROBS["mutation"]
-                        cases *= PROBS["trait"][1][True]
-                        probability *= cases
-                    else:
-                        """
-                        ***
-                         ✔ one_gene.
-                         X have_trait.
-                         1M - 0F v 0M - 1F
-                        """
-                        cases =  (0.5 * PROBS["mutation"]) *  PROBS["mutation"]
-                        cases += (0.5 * (1 - PROBS["mutation"])) * (1 - PROBS["mutation"])
-                        cases += (0.5 * PROBS["mutation"]) * (1 - PROBS["mutation"])
-                        cases += (0.5 * (1 - PROBS["mutation"])) * PROBS["mutation"]
-                        cases *= PROBS["trait"][1][False]
-                        probability *= cases
-                elif parents.count(0) == 1 and parents.count(2) == 1:
-                    if person in have_trait:
-                        """
-                        ***
-                         ✔ one_gene.
-                         ✔ have_trait.
-                         2M - 0F v 0M - 2F
-                        """
-                        probability *= ((1 - PROBS["mutation"])**2 + PROBS["mutation"]**2) * PROBS["trait"][1][True]
-                    else:
-                        """
-                        ***
-                         ✔ one_gene.
-                         X have_trait.
-                         2M - 0F v 0M - 2F
-                        """
-                        probability *= ((1 - PROBS["mutation"])**2 + PROBS["mutation"]**2) * PROBS["trait"][1][False]
-                elif parents.count(1) == 2 :
-                    if person in have_trait:
-                        """
-                        ***
-                         ✔ one_gene.
-                         ✔ have_trait.
-                         1M - 1F
-
-                         ***********CHECK IF 0.5 COMES OUT BEFORE TRAIT*********************
-                         """
-                        cases =  (0.5 * PROBS["mutation"]) * (0.5 * (1 - PROBS["mutation"]))
-                        cases += (0.5 * PROBS["mutation"])**2
-                        cases += (0.5 * (1 - PROBS["mutation"])) * (0.5 * PROBS["mutation"])
-                        cases += (0.5 * (1 - PROBS["mutation"]))**2
-                        cases *= 2
-                        cases *= PROBS["trait"][1][True]
-                        probability *= cases
-                    else:
-                        """
-                        ***
-                         ✔ one_gene.
-                         X have_trait.
-                         1M - 1F
-                        """
-                        cases =  0.5 * PROBS["mutation"] * 0.5 * (1 - PROBS["mutation"])
-                        cases += (0.5 * PROBS["mutation"])**2
-                        cases += 0.5 * (1 - PROBS["mutation"]) * (0.5 * PROBS["mutation"])
-                        cases += (0.5 * (1 - PROBS["mutation"]))**2
-                        cases *= 2
-                        cases *= PROBS["trait"][1][False]
-                        probability *= cases
-                elif parents.count(1) == 1 and parents.count(2) == 2:
-                    if person in have_trait:
-                        """
-                        ***
-                         ✔ one_gene.
-                         ✔ have_trait.
-                         1M - 2F V 2M - 1F.
-                         ***********CHECK IF 0.5 COMES OUT BEFORE TRAIT*********************
-                        """
-                        cases =  (0.5 * PROBS["mutation"] * (1 - PROBS["mutation"]))**2
-                        cases += 0.5 * (1 - PROBS["mutation"]) * PROBS["mutation"]
-                        cases += 0.5 * (1 - PROBS["mutation"]) * (1 - PROBS["mutation"])
-                        cases *= PROBS["trait"][1][True]
-                        probability *= cases
-                    else:
-                        """
-                        ***
-                         ✔ one_gene.
-                         X have_trait.
-                         1M - 2F V 2M - 1F.
-                        """
-                        cases =  (0.5 * PROBS["mutation"] * (1 - PROBS["mutation"]))**2
-                        cases += 0.5 * (1 - PROBS["mutation"]) * PROBS["mutation"]
-                        cases += 0.5 * (1 - PROBS["mutation"]) * (1 - PROBS["mutation"])
-                        cases *= PROBS["trait"][1][False]
-                        probability *= cases
-                elif parents.count(2) == 2:
-                    if person in have_trait:
-                        """
-                        ***
-                         ✔ one_gene.
-                         ✔ have_trait.
-                         2M - 2F.
-                        """
-                        probability *= (PROBS["mutation"] * (1 - PROBS["mutation"]))**2 * PROBS["trait"][1][False]
-                    else:
-                        """
-                        ***
-                         ✔ one_gene set.
-                         X have_trait.
-                         2M - 2F.
-                         """
-                        probability *= (PROBS["mutation"] * (1 - PROBS["mutation"]))**2 * PROBS["trait"][1][False]
-            elif person in two_genes:
-                if parents.count(0) == 2:
-                    if person in have_trait:
-                        """
-                        ***
-                         ✔ two_gene.
-                         ✔ have_trait.
-                         0M, 0F
-                        """
-                        probability *= PROBS["mutation"]**2 * PROBS["trait"][2][True]
-                    else:
-                        """
-                        ***
-                         ✔ two_gene.
-                         X have_trait.
-                         0M - 0D
-                        """
-                        probability *= PROBS["mutation"]**2 * PROBS["trait"][2][False]
-                elif parents.count(0) == 1 and parents.count(1) == 1:
-                    if person in have_trait:
-                        """
-                        ***
-                         ✔ two_gene.
-                         ✔ have_trait.
-                         1M - 0F v 0M - 1F.
-                        """
-                        probability *= (0.5 * (1 - PROBS["mutation"]) * PROBS["mutation"] + 0.5 * PROBS["mutation"] * PROBS["mutation"]) * PROBS["trait"][2][True]
-                    else:
-                        """
-                        ***
-                         ✔ two_gene.
-                         X have_trait.
-                         ✔ 1M - 0F v 0M - 1F
-                        """
-                        probability *= (0.5 * (1 - PROBS["mutation"]) * PROBS["mutation"] + 0.5 * PROBS["mutation"] * PROBS["mutation"]) * PROBS["trait"][2][False]
-                elif parents.count(0) == 1 and parents.count(2) == 1:
-                    if person in have_trait:
-                        """
-                        ***
-                         ✔ two_gene.
-                         ✔ have_trait.
-                         2M - 0F v 0M - 2F
-                         """
-                        probability *= (1 - PROBS["mutation"]) * PROBS["mutation"] * PROBS["trait"][2][True]
-                    else:
-                        """
-                        ***
-                         ✔ two_gene.
-                         X have_trait.
-                         2M - 0F v 0M - 2F
-                         """
-                        probability *= (1 - PROBS["mutation"]) * PROBS["mutation"] * PROBS["trait"][2][False]
-                elif parents.count(1) == 2 :
-                    if person in have_trait:
-                        """
-                        ***
-                         ✔ two_gene.
-                         ✔ have_trait.
-                         1M - 1F
-                         ***********CHECK IF 0.25 COMES OUT BEFORE TRAIT*********************
-                        """
-                        cases =  (0.5 * (1 - PROBS["mutation"]))**2
-                        cases += (0.5 * (1 - PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * 2
-                        cases += (0.5  * PROBS["mutation"])**2
-                        cases *= PROBS["trait"][2][True]
-                        probability *= cases
-                    else:
-                        """
-                        ***
-                         ✔ two_gene.
-                         X have_trait.
-                         1M - 1F
-                         ***********CHECK IF 0.25 COMES OUT BEFORE TRAIT*********************
-                         """
-                        cases =  (0.5 * (1 - PROBS["mutation"]))**2
-                        cases += (0.5 * (1 - PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * 2
-                        cases += (0.5  * PROBS["mutation"])**2
-                        cases *= PROBS["trait"][2][False]
-                        probability *= cases
-                elif parents.count(1) == 1 and parents.count(2) == 2:
-                    if person in have_trait:
-                        """
-                        ***
-                         ✔ two_gene.
-                         ✔ have_trait.
-                         1M - 2F V 2M - 1F.
-                         """
-                        probability *= 0.5 * (1 - PROBS["mutation"]) * (1 - PROBS["mutation"]) + 0.5 * PROBS["mutation"] * (1 - PROBS["mutation"]) * PROBS["trait"][2][True]
-                    else:
-                        """
-                        ***
-                         ✔ two_gene set.
-                         X have_trait.
-                         1
-                        M - 2F V 2M - 1F.
-                        """
-                        probability *= 0.5 * (1 - PROBS["mutation"]) * (1 - PROBS["mutation"]) + 0.5 * PROBS["mutation"] * (1 - PROBS["mutation"]) * PROBS["trait"][2][False]
-                elif parents.count(2) == 2:
-                    if person in have_trait:
-                        """
-                        ***
-                         ✔ two_gene.
-                         ✔ have_trait.
-                         2M - 2F.
-                        """
-                        probability *= (1 - PROBS["mutation"])**2 * PROBS["trait"][2][True]
-                    else:
-                        """
-                        ***
-                         ✔ two_gene set.
-                         X have_trait.
-                         2M - 2F.
-                        """
-                        probability *= (1 - PROBS["mutation"])**2 * PROBS["trait"][2][False]
-            else:
-                if parents.count(0) == 2:
-                    if person in have_trait:
-                        """
-                        ***
-                         X gene.
-                         ✔ have_trait.
-                         0M - 0F
-                         """
-                        probability *= PROBS["mutation"]**2 * PROBS["trait"][0][True]
-                    else:
-                        """
-                        ***
-                         X gene.
-                         X have_trait.
-                         0M - 0F
-                         """
-                        probability *= PROBS["mutation"]**2 * PROBS["trait"][0][False]
-                elif parents.count(0) == 1 and parents.count(1) == 1:
-                    if person in have_trait:
-                        """
-                        ***
-                         X gene.
-                         ✔ have_trait.
-                         ✔ 0M - 1F v 1M - 0F.
-                        """
-                        probability *= 0.5 * PROBS["mutation"] * (1 - PROBS["mutation"]) + 0.5 * (1 - PROBS["mutation"]) * (1 - PROBS["mutation"]) * PROBS["trait"][0][True]
-                    else:
-                        """
-                        ***
-                         X gene.
-                         X have_trait.
-                         ✔ 0M - 1F v 1M - 0F.
-                         """
-                        probability *= 0.5 * PROBS["mutation"] * (1 - PROBS["mutation"]) + 0.5 * (1 - PROBS["mutation"]) * (1 - PROBS["mutation"]) * PROBS["trait"][0][False]
-                elif parents.count(0) == 1 and parents.count(2) == 1:
-                    if person in have_trait:
-                        """
-                        ***
-                         X gene.
-                         ✔ have_trait.
-                         2M - 0F v 0M - 2F
-                         """
-                        probability *= (1 - PROBS["mutation"]) * PROBS["mutation"] * PROBS["trait"][0][True]
-                    else:
-                        """
-                        ***
-                         X gene.
-                         X have_trait.
-                         2M - 0F v 0M - 2F
-                        """
-                        probability *= (1 - PROBS["mutation"]) * PROBS["mutation"] * PROBS["trait"][0][False]
-                elif parents.count(1) == 2 :
-                    if person in have_trait:
-                        """
-                        ***
-                         X gene.
-                         ✔ have_trait.
-                         1M - 1F
-                        """
-                        cases =  (0.5 * PROBS["mutation"])**2
-                        cases += (0.5 * (1 - PROBS["mutation"]))**2
-                        cases += 0.5 * PROBS["mutation"] * 0.5 * (1 - PROBS["mutation"])
-                        cases *= PROBS["trait"][0][True]
-                        probability *= cases
-                    else:
-                        """
-                        ***
-                         X gene.
-                         X have_trait.
-                         1M - 1F
-                         """
-                        cases =  (0.5 * PROBS["mutation"])**2
-                        cases += (0.5 * (1 - PROBS["mutation"]))**2
-                        cases += 0.5 * PROBS["mutation"] * 0.5 * (1 - PROBS["mutation"])
-                        cases *= PROBS["trait"][0][False]
-                        probability *= cases
-                elif parents.count(1) == 1 and parents.count(2) == 2:
-                    if person in have_trait:
-                        """
-                        ***
-                         X gene.
-                         ✔ have_trait.
-                         1M - 2F V 2M - 1F.
-                        """
-                        probability *= 0.5 * PROBS["mutation"] * PROBS["mutation"] + 0.5 * (1 - PROBS["mutation"]) * PROBS["mutation"] * PROBS["trait"][0][True]
-                    else:
-                        """
-                        ***
-                         X gene.
-                         X have_trait.
-                         1M - 2F V 2M - 1F.
-                         """
-                        probability *= 0.5 * PROBS["mutation"] * PROBS["mutation"] + 0.5 * (1 - PROBS["mutation"]) * PROBS["mutation"] * PROBS["trait"][0][False]
-                elif parents.count(2) == 2:
-                    if person in have_trait:
-                        """
-                        ---
-                         X gene.
-                         ✔ have_trait.
-                         2M - 2F.
-                        """
-                        probability *= PROBS["mutation"]**2 * PROBS["trait"][0][True]
-                    else:
-                        """
-                        
-                         X gene.
-                         X have_trait.
-                         2M - 2F.
-                         """
-                        probability *= PROBS["mutation"]**2 * PROBS["trait"][0][False]
+            probability *= INHERITANCE[genes[data["mother"]]][genes[data["father"]]][count]
+
+        probability *= TRAIT[count][person in have_trait]
 
     return probability
 
-    raise NotImplementedError
+
+def compare(probabilities, other):
+    """
+    Return the largest difference between any probability in
+    `probabilities` and the same probability in `other`.
+    """
+    return max(
+        abs(probabilities[person][field][value] - other[person][field][value])
+        for person in probabilities
+        for field in probabilities[person]
+        for value in probabilities[person][field]
+    )
+
+
+def enumerate_probabilities(people):
+    """
+    Return gene and trait probabilities for every person, in the form of
+    `probabilities` in `main`, by summing the joint probability of every
+    assignment of gene counts to everyone.
+
+    Unknown traits are summed out per person instead of enumerated: given
+    everyone's gene counts, a person has the trait with probability
+    TRAIT[genes][True] independently of everyone else.
+    """
+    names = list(people)
+    index = {person: i for i, person in enumerate(names)}
+    parents = [
+        None if people[person]["mother"] is None else
+        (index[people[person]["mother"]], index[people[person]["father"]])
+        for person in names
+    ]
+    traits = [people[person]["trait"] for person in names]
+
+    gene_totals = [[0, 0, 0] for _ in names]
+    trait_totals = [[0, 0] for _ in names]
+    for genes in itertools.product(range(3), repeat=len(names)):
+        p = 1
+        for count, parent, trait in zip(genes, parents, traits):
+            if parent is None:
+                p *= GENE[count]
+            else:
+                p *= INHERITANCE[genes[parent[0]]][genes[parent[1]]][count]
+            if trait is not None:
+                p *= TRAIT[count][trait]
+
+        for i, count in enumerate(genes):
+            gene_totals[i][count] += p
+            if traits[i] is None:
+                trait_totals[i][True] += p * TRAIT[count][True]
+                trait_totals[i][False] += p * TRAIT[count][False]
+            else:
+                trait_totals[i][traits[i]] += p
+
+    probabilities = {
+        person: {
+            "gene": {genes: gene_totals[i][genes] for genes in (2, 1, 0)},
+            "trait": {True: trait_totals[i][True], False: trait_totals[i][False]}
+        }
+        for i, person in enumerate(names)
+    }
+    normalize(probabilities)
+    return probabilities
 
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
@@ -606,16 +263,6 @@ def bayers(pba, pa, pb):
     '''
     return pba * pa / pb
 
-def find_parents(parents, one_gene, two_gene):
-    for i in range(len(parents)):
-        if parents[i] in one_gene:
-            parents[i] = 1
-        elif parents[i] in two_gene:
-            parents[i] = 2
-        else:
-            parents[i] = 0
-
-    return parents
 
 if __name__ == "__main__":
     main()
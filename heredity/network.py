@@ -0,0 +1,229 @@
+import itertools
+
+# Possible numbers of copies of the gene a person has
+GENES = (0, 1, 2)
+
+
+class Factor():
+    """
+    A table of non-negative values for every assignment of gene counts to
+    a tuple of people. Values are stored in a flat list, with the last
+    person's count varying fastest.
+    """
+
+    def __init__(self, variables, values):
+        self.variables = tuple(variables)
+        self.values = list(values)
+
+    def __repr__(self):
+        return f"Factor({self.variables}, {self.values})"
+
+    def normalized(self):
+        """
+        Return this factor scaled to sum to 1, which changes no marginal
+        but keeps products of many factors from underflowing.
+        """
+        total = sum(self.values)
+        if total == 0:
+            return self
+        return Factor(self.variables, [value / total for value in self.values])
+
+
+def combine(factors, keep):
+    """
+    Multiply `factors` together and sum out every person not in `keep`,
+    returning a normalized factor over `keep` in that order.
+    """
+    keep = tuple(keep)
+    others = []
+    for factor in factors:
+        for variable in factor.variables:
+            if variable not in keep and variable not in others:
+                others.append(variable)
+    variables = keep + tuple(others)
+    position = {variable: i for i, variable in enumerate(variables)}
+
+    # Position in `variables` and stride of every variable of each factor
+    layouts = []
+    for factor in factors:
+        layout = []
+        stride = 1
+        for variable in reversed(factor.variables):
+            layout.append((position[variable], stride))
+            stride *= len(GENES)
+        layouts.append((factor.values, layout))
+
+    values = [0] * len(GENES) ** len(keep)
+    for assignment in itertools.product(GENES, repeat=len(variables)):
+        product = 1
+        for table, layout in layouts:
+            product *= table[sum(assignment[i] * stride for i, stride in layout)]
+            if product == 0:
+                break
+        index = 0
+        for value in assignment[:len(keep)]:
+            index = index * len(GENES) + value
+        values[index] += product
+
+    return Factor(keep, values).normalized()
+
+
+def inherit_probability(parent_genes, mutation):
+    """
+    Return the probability that a parent with `parent_genes` copies of the
+    gene passes one copy on to a child.
+    """
+    if parent_genes == 2:
+        return 1 - mutation
+    if parent_genes == 1:
+        return 0.5
+    return mutation
+
+
+def inheritance_table(mutation):
+    """
+    Return a nested list where entry [mother][father][child] is the
+    probability that a child has `child` copies of the gene given that
+    their parents have `mother` and `father` copies.
+    """
+    table = []
+    for mother in GENES:
+        from_mother = inherit_probability(mother, mutation)
+        table.append([])
+        for father in GENES:
+            from_father = inherit_probability(father, mutation)
+            table[mother].append([
+                (1 - from_mother) * (1 - from_father),
+                from_mother * (1 - from_father) + (1 - from_mother) * from_father,
+                from_mother * from_father
+            ])
+    return table
+
+
+def person_factor(person, people, probs):
+    """
+    Return the factor of `person`'s gene count given their parents' gene
+    counts, or the unconditional gene distribution if their parents are
+    unknown, multiplied by the probability of their trait if it is known.
+    """
+    data = people[person]
+    trait = data["trait"]
+
+    def evidence(genes):
+        return 1 if trait is None else probs["trait"][genes][trait]
+
+    if data["mother"] is None:
+        return Factor((person,), [
+            probs["gene"][genes] * evidence(genes) for genes in GENES
+        ])
+
+    inheritance = inheritance_table(probs["mutation"])
+    values = [
+        inheritance[mother][father][genes] * evidence(genes)
+        for mother, father, genes in itertools.product(GENES, repeat=3)
+    ]
+    return Factor((data["mother"], data["father"], person), values)
+
+
+def elimination_order(factors):
+    """
+    Return an order in which to eliminate the people in `factors`, always
+    choosing the person who shares a factor with the fewest others that
+    remain, to keep the intermediate factors small.
+    """
+    neighbors = dict()
+    for factor in factors:
+        for variable in factor.variables:
+            neighbors.setdefault(variable, set()).update(factor.variables)
+    for variable in neighbors:
+        neighbors[variable].discard(variable)
+
+    order = []
+    while neighbors:
+        variable = min(neighbors, key=lambda v: (len(neighbors[v]), str(v)))
+        order.append(variable)
+
+        # Eliminating a person connects everyone they shared a factor with
+        for neighbor in neighbors[variable]:
+            neighbors[neighbor] |= neighbors[variable]
+            neighbors[neighbor] -= {neighbor, variable}
+        del neighbors[variable]
+    return order
+
+
+def gene_marginals(people, probs):
+    """
+    Return a dictionary mapping each person to the distribution of their
+    number of copies of the gene, given every known trait.
+
+    The pedigree is a Bayesian network with one gene node per person,
+    conditioned on the parents' gene nodes. Eliminating the people one at
+    a time forms a tree of cliques (a junction tree): eliminating a person
+    sends a message to the clique of the next person in that message. One
+    pass up and one pass down this tree give every person's marginal.
+    """
+    factors = [person_factor(person, people, probs) for person in people]
+    order = elimination_order(factors)
+    step = {variable: i for i, variable in enumerate(order)}
+
+    # Give each factor to the clique of its first eliminated person
+    potentials = [[] for _ in order]
+    for factor in factors:
+        potentials[min(step[v] for v in factor.variables)].append(factor)
+
+    # Upward pass, which is variable elimination in `order`
+    scopes = []
+    incoming = [[] for _ in order]
+    for i, variable in enumerate(order):
+        clique = potentials[i] + [message for _, message in incoming[i]]
+        scope = set()
+        for factor in clique:
+            scope.update(factor.variables)
+        scope.discard(variable)
+        scope = tuple(sorted(scope, key=step.get))
+        message = combine(clique, scope)
+        scopes.append(scope)
+        if scope:
+            incoming[step[scope[0]]].append((i, message))
+
+    # Downward pass, from the last clique eliminated back to the first
+    downward = [None] * len(order)
+    marginals = dict()
+    for i in reversed(range(len(order))):
+        clique = potentials[i] + [message for _, message in incoming[i]]
+        if downward[i] is not None:
+            clique.append(downward[i])
+        marginals[order[i]] = combine(clique, (order[i],)).values
+        for child, _ in incoming[i]:
+            others = [message for j, message in incoming[i] if j != child]
+            context = potentials[i] + others
+            if downward[i] is not None:
+                context.append(downward[i])
+            downward[child] = combine(context, scopes[child])
+
+    return {
+        person: dict(zip(GENES, marginals[person])) for person in people
+    }
+
+
+def marginals(people, probs):
+    """
+    Return, for every person, the distribution of their number of copies
+    of the gene and of whether they have the trait, given every known
+    trait, in the form that `heredity.main` prints.
+    """
+    genes = gene_marginals(people, probs)
+    probabilities = dict()
+    for person in people:
+        trait = people[person]["trait"]
+        if trait is None:
+            has_trait = sum(
+                genes[person][g] * probs["trait"][g][True] for g in GENES
+            )
+        else:
+            has_trait = 1 if trait else 0
+        probabilities[person] = {
+            "gene": {g: genes[person][g] for g in (2, 1, 0)},
+            "trait": {True: has_trait, False: 1 - has_trait}
+        }
+    return probabilities
@@ -0,0 +1,188 @@
+import argparse
+import random
+import sys
+import time
+
+from logic import *
+
+BACKENDS = {
+    "model_check": model_check,
+    "dpll": dpll_check
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark knights reasoning backends."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 3, 4, 5],
+                        help="number of characters (or 3-SAT variables / 2)")
+    parser.add_argument("--trials", type=int, default=5,
+                        help="instances generated per size")
+    parser.add_argument("--depths", type=int, nargs="+",
+                        default=[500, 1000, 2000],
+                        help="nesting depths of sentences to encode")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS),
+                        choices=list(BACKENDS))
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    backends = {name: BACKENDS[name] for name in args.backends}
+    generators = [
+        ("puzzle", lambda n: random_puzzle(n, rng)),
+        ("3-sat", lambda n: random_3sat(2 * n, rng))
+    ]
+
+    for kind, generate in generators:
+        print(kind)
+        for n in args.sizes:
+            instances = [generate(n) for _ in range(args.trials)]
+            times = run(instances, backends)
+            summary = ", ".join(
+                f"{name} {seconds:.4f}s" for name, seconds in times.items()
+            )
+            print(f"  n = {n}: {summary}")
+
+    # Each level of nesting takes a few frames of recursion
+    sys.setrecursionlimit(
+        max(sys.getrecursionlimit(), 10 * max(args.depths))
+    )
+    for kind, generate in [("chain", nested_chain), ("shared", nested_shared)]:
+        print(f"encoding {kind}")
+        for depth in args.depths:
+            sentence = generate(depth)
+            seconds, clauses = time_encoding(sentence)
+            print(f"  depth = {depth}: simplify {seconds['simplify']:.4f}s, "
+                  f"tseitin {seconds['tseitin']:.4f}s, {clauses} clauses")
+
+
+def random_puzzle(n, rng=random):
+    """
+    Generate a random knights and knaves puzzle with `n` characters.
+
+    Return a pair (symbols, knowledge) where symbols lists the knight and
+    knave symbols of every character and knowledge encodes the rules of the
+    game together with one random statement made by each character.
+    """
+    knights = [Symbol(f"{chr(65 + i)} is a Knight") for i in range(n)]
+    knaves = [Symbol(f"{chr(65 + i)} is a Knave") for i in range(n)]
+
+    knowledge = And()
+    for i in range(n):
+
+        # Every character is either a knight or a knave, never both
+        knowledge.add(Or(knights[i], knaves[i]))
+        knowledge.add(Not(And(knights[i], knaves[i])))
+
+        # Knights only say true statements and knaves only false ones
+        statement = random_statement(knights, knaves, rng)
+        knowledge.add(Implication(knights[i], statement))
+        knowledge.add(Implication(knaves[i], Not(statement)))
+
+    symbols = [symbol for pair in zip(knights, knaves) for symbol in pair]
+    return symbols, knowledge
+
+
+def random_statement(knights, knaves, rng=random):
+    """
+    Return a random statement about one or two of the characters.
+    """
+    x = rng.randrange(len(knights))
+    y = rng.randrange(len(knights))
+    statements = [
+        lambda: knights[x],
+        lambda: knaves[x],
+        lambda: And(knights[x], knights[y]),
+        lambda: Or(knaves[x], knaves[y]),
+        lambda: Biconditional(knights[x], knights[y]),
+        lambda: Implication(knights[x], knaves[y])
+    ]
+    return rng.choice(statements)()
+
+
+def random_3sat(n, rng=random, ratio=4.26):
+    """
+    Generate a random 3-SAT instance over `n` variables with about
+    `ratio * n` clauses, close to the hardest satisfiability threshold.
+
+    Return a pair (symbols, knowledge).
+    """
+    symbols = [Symbol(f"x{i}") for i in range(n)]
+    knowledge = And()
+    for _ in range(max(1, round(ratio * n))):
+        clause = rng.sample(symbols, min(3, n))
+        knowledge.add(Or(*[
+            symbol if rng.random() < 0.5 else Not(symbol)
+            for symbol in clause
+        ]))
+    return symbols, knowledge
+
+
+def nested_chain(depth):
+    """
+    Return a sentence nested `depth` levels deep, where every level holds
+    the previous one once.
+    """
+    sentence = Symbol("p")
+    for i in range(depth):
+        sentence = And(Or(sentence, Symbol(f"q{i}")), Symbol(f"s{i}"))
+    return sentence
+
+
+def nested_shared(depth):
+    """
+    Return a sentence nested `depth` levels deep, where every level holds
+    the previous one twice, so that it has 2 ** depth paths but only a few
+    distinct subsentences per level.
+    """
+    sentence = Symbol("p")
+    for i in range(depth):
+        sentence = And(
+            Or(sentence, Symbol(f"q{i}")),
+            Implication(sentence, Symbol(f"s{i}"))
+        )
+    return sentence
+
+
+def time_encoding(sentence):
+    """
+    Time simplifying `sentence` and encoding it into clauses.
+
+    Return a pair (seconds, clauses) with a dictionary of the time spent
+    in `simplify` and `tseitin`, and the number of clauses.
+    """
+    seconds = dict()
+    start = time.perf_counter()
+    simplify(sentence)
+    seconds["simplify"] = time.perf_counter() - start
+    start = time.perf_counter()
+    clauses = tseitin(sentence)
+    seconds["tseitin"] = time.perf_counter() - start
+    return seconds, len(clauses)
+
+
+def run(instances, backends):
+    """
+    Ask every backend whether each instance entails each of its symbols.
+
+    Return a dictionary mapping each backend name to the total time spent.
+    Raise an exception if two backends disagree on any query.
+    """
+    times = {name: 0 for name in backends}
+    for symbols, knowledge in instances:
+        for query in symbols:
+            answers = dict()
+            for name, check in backends.items():
+                start = time.perf_counter()
+                answers[name] = check(knowledge, query)
+                times[name] += time.perf_counter() - start
+            if len(set(answers.values())) > 1:
+                raise Exception(
+                    f"backends disagree on {query.formula()}: {answers}"
+                )
+    return times
+
+
+if __name__ == "__main__":
+    main()
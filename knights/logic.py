@@ -9,7 +9,17 @@ class Sentence():
 
     def formula(self):
         """Returns string formula representing logical sentence."""
-        return ""
+        parts = []
+        self.render(parts.append)
+        return "".join(parts)
+
+    def render(self, write):
+        """Passes the formula to `write` piece by piece, in order."""
+        pass
+
+    def is_atomic(self):
+        """Checks if the formula never needs parentheses around it."""
+        return True
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
@@ -41,6 +51,16 @@ class Sentence():
         else:
             return f"({s})"
 
+    @classmethod
+    def render_operand(cls, sentence, write):
+        """Renders an operand, parenthesized if it is not atomic."""
+        if sentence.is_atomic():
+            sentence.render(write)
+        else:
+            write("(")
+            sentence.render(write)
+            write(")")
+
 
 class Symbol(Sentence):
 
@@ -62,8 +82,11 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
-    def formula(self):
-        return self.name
+    def render(self, write):
+        write(self.name)
+
+    def is_atomic(self):
+        return Sentence.parenthesize(self.name) == self.name
 
     def symbols(self):
         return {self.name}
@@ -86,8 +109,12 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
-    def formula(self):
-        return "¬" + Sentence.parenthesize(self.operand.formula())
+    def render(self, write):
+        write("¬")
+        Sentence.render_operand(self.operand, write)
+
+    def is_atomic(self):
+        return False
 
     def symbols(self):
         return self.operand.symbols()
@@ -120,14 +147,21 @@ class And(Sentence):
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
-    def formula(self):
+    def render(self, write):
+        if len(self.conjuncts) == 1:
+            return self.conjuncts[0].render(write)
+        for i, conjunct in enumerate(self.conjuncts):
+            if i:
+                write(" ∧ ")
+            Sentence.render_operand(conjunct, write)
+
+    def is_atomic(self):
         if len(self.conjuncts) == 1:
-            return self.conjuncts[0].formula()
-        return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
-                           for conjunct in self.conjuncts])
+            return self.conjuncts[0].is_atomic()
+        return not self.conjuncts
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return set().union(*[conjunct.symbols() for conjunct in self.conjuncts])
 
 
 class Or(Sentence):
@@ -151,14 +185,21 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
-    def formula(self):
+    def render(self, write):
         if len(self.disjuncts) == 1:
-            return self.disjuncts[0].formula()
-        return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
-                            for disjunct in self.disjuncts])
+            return self.disjuncts[0].render(write)
+        for i, disjunct in enumerate(self.disjuncts):
+            if i:
+                write(" ∨  ")
+            Sentence.render_operand(disjunct, write)
+
+    def is_atomic(self):
+        if len(self.disjuncts) == 1:
+            return self.disjuncts[0].is_atomic()
+        return not self.disjuncts
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return set().union(*[disjunct.symbols() for disjunct in self.disjuncts])
 
 
 class Implication(Sentence):
@@ -183,10 +224,13 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
-    def formula(self):
-        antecedent = Sentence.parenthesize(self.antecedent.formula())
-        consequent = Sentence.parenthesize(self.consequent.formula())
-        return f"{antecedent} => {consequent}"
+    def render(self, write):
+        Sentence.render_operand(self.antecedent, write)
+        write(" => ")
+        Sentence.render_operand(self.consequent, write)
+
+    def is_atomic(self):
+        return False
 
     def symbols(self):
         return set.union(self.antecedent.symbols(), self.consequent.symbols())
@@ -216,10 +260,13 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
-    def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
-        return f"{left} <=> {right}"
+    def render(self, write):
+        Sentence.render_operand(self.left, write)
+        write(" <=> ")
+        Sentence.render_operand(self.right, write)
+
+    def is_atomic(self):
+        return False
 
     def symbols(self):
         return set.union(self.left.symbols(), self.right.symbols())
@@ -261,3 +308,352 @@ def model_check(knowledge, query):
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def write_formula(sentence, file, buffer_size=65536):
+    """
+    Writes the formula of `sentence` to a file object, flushing it in
+    chunks of about `buffer_size` characters so that huge knowledge bases
+    never have to be held in memory as a single string.
+    """
+    parts = []
+    size = 0
+
+    def write(part):
+        nonlocal size
+        parts.append(part)
+        size += len(part)
+        if size >= buffer_size:
+            file.write("".join(parts))
+            parts.clear()
+            size = 0
+
+    sentence.render(write)
+    file.write("".join(parts))
+
+
+def is_true(sentence):
+    """Checks if a sentence is the constant true (an empty conjunction)."""
+    return isinstance(sentence, And) and not sentence.conjuncts
+
+
+def is_false(sentence):
+    """Checks if a sentence is the constant false (an empty disjunction)."""
+    return isinstance(sentence, Or) and not sentence.disjuncts
+
+
+def negate(sentence, cache=None):
+    """
+    Returns the negation of a sentence, folding constants and ¬¬.
+
+    With a `cache` from `simplify`, the negation of a simplified sentence
+    is built through `intern`, so it is identical to any equal one.
+    """
+    if is_true(sentence):
+        return Or() if cache is None else intern(cache, Or)
+    if is_false(sentence):
+        return And() if cache is None else intern(cache, And)
+    if isinstance(sentence, Not):
+        return sentence.operand
+    return Not(sentence) if cache is None else intern(cache, Not, sentence)
+
+
+def intern(cache, kind, *operands):
+    """
+    Returns the sentence of type `kind` with `operands` (or the name of a
+    Symbol) stored in `cache`, building it the first time. Operands must
+    themselves come from `cache`, so that equal sentences built this way
+    are always the same object and can be compared by identity.
+    """
+    key = (kind,) + tuple(
+        operand if isinstance(operand, str) else id(operand)
+        for operand in operands
+    )
+    if key not in cache:
+        cache[key] = kind(*operands)
+    return cache[key]
+
+
+def simplify(sentence, cache=None):
+    """
+    Returns a sentence equivalent to `sentence` where constants are folded,
+    nested conjunctions and disjunctions are flattened and duplicated
+    operands are removed.
+
+    True is represented as And() and false as Or(). Subsentences are
+    remembered by identity, so one shared by several sentences is only
+    simplified once, and results are built through `intern`, so comparing
+    them never walks their operands. The cost is linear in the number of
+    distinct subsentence objects, however often they are shared.
+    """
+    if cache is None:
+        cache = dict()
+    if id(sentence) in cache:
+        return cache[id(sentence)][1]
+
+    if isinstance(sentence, Symbol):
+        result = intern(cache, Symbol, sentence.name)
+
+    elif isinstance(sentence, Not):
+        result = negate(simplify(sentence.operand, cache), cache)
+
+    elif isinstance(sentence, (And, Or)):
+        conjunction = isinstance(sentence, And)
+        kind = And if conjunction else Or
+        identity = is_true if conjunction else is_false
+        absorbing = is_false if conjunction else is_true
+        operands = sentence.conjuncts if conjunction else sentence.disjuncts
+
+        # Flatten nested operands of the same kind, dropping duplicates
+        flat = []
+        seen = set()
+        pending = [simplify(operand, cache) for operand in operands]
+        pending.reverse()
+        while pending:
+            operand = pending.pop()
+            if isinstance(operand, kind):
+                inner = (operand.conjuncts if conjunction
+                         else operand.disjuncts)
+                pending.extend(reversed(inner))
+                continue
+            if identity(operand) or id(operand) in seen:
+                continue
+            if absorbing(operand) or id(negate(operand, cache)) in seen:
+                flat = None
+                break
+            seen.add(id(operand))
+            flat.append(operand)
+
+        if flat is None:
+            result = intern(cache, Or if conjunction else And)
+        elif len(flat) == 1:
+            result = flat[0]
+        else:
+            result = intern(cache, kind, *flat)
+
+    elif isinstance(sentence, Implication):
+        antecedent = simplify(sentence.antecedent, cache)
+        consequent = simplify(sentence.consequent, cache)
+        if is_true(antecedent):
+            result = consequent
+        elif is_false(antecedent) or is_true(consequent):
+            result = intern(cache, And)
+        elif is_false(consequent):
+            result = negate(antecedent, cache)
+        elif antecedent is consequent:
+            result = intern(cache, And)
+        elif negate(antecedent, cache) is consequent:
+            result = consequent
+        else:
+            result = intern(cache, Implication, antecedent, consequent)
+
+    elif isinstance(sentence, Biconditional):
+        left = simplify(sentence.left, cache)
+        right = simplify(sentence.right, cache)
+        if is_true(left):
+            result = right
+        elif is_true(right):
+            result = left
+        elif is_false(left):
+            result = negate(right, cache)
+        elif is_false(right):
+            result = negate(left, cache)
+        elif left is right:
+            result = intern(cache, And)
+        elif negate(left, cache) is right:
+            result = intern(cache, Or)
+        else:
+            result = intern(cache, Biconditional, left, right)
+
+    else:
+        raise TypeError("must be a logical sentence")
+
+    # Keep the sentence alive, so that its id is not reused
+    cache[id(sentence)] = (sentence, result)
+    return result
+
+
+def tseitin(sentence):
+    """
+    Returns a list of clauses equisatisfiable with `sentence`.
+
+    Each clause is a frozenset of literals, and each literal is a
+    (symbol name, polarity) pair. Every compound subsentence gets a fresh
+    auxiliary symbol defined by a handful of clauses, so the number of
+    clauses grows linearly with the size of the sentence. Subsentences of
+    the simplified sentence are encoded by identity, so shared ones get a
+    single symbol and are encoded once. Auxiliary symbols
+    are named "_t0", "_t1", ... and never appear in the original sentence.
+    """
+    clauses = []
+    literals = dict()
+    counter = itertools.count()
+
+    def fresh():
+        return (f"_t{next(counter)}", True)
+
+    def complement(literal):
+        return (literal[0], not literal[1])
+
+    def encode(sentence):
+        """Returns a literal equivalent to `sentence`, defining it if needed."""
+        if id(sentence) in literals:
+            return literals[id(sentence)][1]
+
+        if isinstance(sentence, Symbol):
+            literal = (sentence.name, True)
+
+        elif isinstance(sentence, Not):
+            literal = complement(encode(sentence.operand))
+
+        elif isinstance(sentence, And):
+            operands = [encode(conjunct) for conjunct in sentence.conjuncts]
+            literal = fresh()
+            for operand in operands:
+                clauses.append(frozenset([complement(literal), operand]))
+            clauses.append(frozenset(
+                [literal] + [complement(operand) for operand in operands]
+            ))
+
+        elif isinstance(sentence, Or):
+            operands = [encode(disjunct) for disjunct in sentence.disjuncts]
+            literal = fresh()
+            for operand in operands:
+                clauses.append(frozenset([literal, complement(operand)]))
+            clauses.append(frozenset([complement(literal)] + operands))
+
+        elif isinstance(sentence, Implication):
+            antecedent = encode(sentence.antecedent)
+            consequent = encode(sentence.consequent)
+            literal = fresh()
+            clauses.append(frozenset(
+                [complement(literal), complement(antecedent), consequent]
+            ))
+            clauses.append(frozenset([literal, antecedent]))
+            clauses.append(frozenset([literal, complement(consequent)]))
+
+        elif isinstance(sentence, Biconditional):
+            left = encode(sentence.left)
+            right = encode(sentence.right)
+            literal = fresh()
+            clauses.append(frozenset(
+                [complement(literal), complement(left), right]
+            ))
+            clauses.append(frozenset(
+                [complement(literal), left, complement(right)]
+            ))
+            clauses.append(frozenset([literal, left, right]))
+            clauses.append(frozenset(
+                [literal, complement(left), complement(right)]
+            ))
+
+        else:
+            raise TypeError("must be a logical sentence")
+
+        literals[id(sentence)] = (sentence, literal)
+        return literal
+
+    def assert_true(sentence):
+        """Adds clauses forcing `sentence` to be true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                assert_true(conjunct)
+        elif isinstance(sentence, Or):
+            clauses.append(frozenset(
+                encode(disjunct) for disjunct in sentence.disjuncts
+            ))
+        elif isinstance(sentence, Implication):
+            clauses.append(frozenset([
+                complement(encode(sentence.antecedent)),
+                encode(sentence.consequent)
+            ]))
+        else:
+            clauses.append(frozenset([encode(sentence)]))
+
+    assert_true(simplify(sentence))
+
+    # Drop duplicated and tautological clauses
+    unique = []
+    seen = set()
+    for clause in clauses:
+        if clause in seen or any(
+            complement(literal) in clause for literal in clause
+        ):
+            continue
+        seen.add(clause)
+        unique.append(clause)
+    return unique
+
+
+def to_cnf(sentence):
+    """
+    Returns a sentence in conjunctive normal form that is equisatisfiable
+    with `sentence` and entails the same queries over its symbols.
+    """
+    def literal(name, polarity):
+        symbol = Symbol(name)
+        return symbol if polarity else Not(symbol)
+
+    return And(*[
+        Or(*[literal(name, polarity) for name, polarity in sorted(clause)])
+        for clause in tseitin(sentence)
+    ])
+
+
+def satisfiable(clauses):
+    """
+    Checks if a list of clauses, as returned by `tseitin`, is satisfiable
+    using DPLL search with unit propagation.
+    """
+
+    def propagate(clauses, model):
+        """
+        Assigns literals forced by unit clauses. Returns the simplified
+        clauses, or None if some clause became empty.
+        """
+        while True:
+            unit = None
+            remaining = []
+            for clause in clauses:
+                if any(model.get(name) == polarity
+                       for name, polarity in clause):
+                    continue
+                open_literals = [
+                    (name, polarity) for name, polarity in clause
+                    if name not in model
+                ]
+                if not open_literals:
+                    return None
+                if len(open_literals) == 1 and unit is None:
+                    unit = open_literals[0]
+                remaining.append(open_literals)
+            if unit is None:
+                return remaining
+            model[unit[0]] = unit[1]
+            clauses = remaining
+
+    def search(clauses, model):
+        clauses = propagate(clauses, model)
+        if clauses is None:
+            return False
+        if not clauses:
+            return True
+
+        # Branch on a literal from the shortest remaining clause
+        name, polarity = min(clauses, key=len)[0]
+        for value in (polarity, not polarity):
+            branch = model.copy()
+            branch[name] = value
+            if search(clauses, branch):
+                return True
+        return False
+
+    return search([list(clause) for clause in clauses], dict())
+
+
+def dpll_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, by checking that knowledge
+    together with the negated query is unsatisfiable.
+    """
+    return not satisfiable(tseitin(And(knowledge, Not(query))))
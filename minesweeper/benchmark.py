@@ -0,0 +1,105 @@
+import argparse
+import random
+import time
+
+from minesweeper import (
+    BitSentence, Minesweeper, MinesweeperAI, Sentence, neighborhood
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare tuple-set and bitmask sentences."
+    )
+    parser.add_argument("--height", type=int, default=100)
+    parser.add_argument("--width", type=int, default=100)
+    parser.add_argument("--mines", type=int, default=1600)
+    parser.add_argument("--sentences", type=int, default=20000)
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"Sentence operations ({args.height}x{args.width}, "
+          f"{args.sentences} sentences)")
+    for name, make in representations(args.width).items():
+        seconds = time_operations(
+            make, args.height, args.width, args.sentences, args.seed
+        )
+        print(f"  {name}: {seconds:.4f}s")
+
+    print(f"AI games ({args.height}x{args.width}, {args.mines} mines, "
+          f"{args.games} games)")
+    for bitsets in (False, True):
+        moves, seconds = time_games(
+            args.height, args.width, args.mines, args.games, args.seed, bitsets
+        )
+        name = "bitmask" if bitsets else "tuple set"
+        print(f"  {name}: {moves} moves in {seconds:.4f}s of add_knowledge")
+
+
+def representations(width):
+    """
+    Return a function building each kind of sentence from cells and count.
+    """
+    return {
+        "tuple set": lambda cells, count: Sentence(cells, count),
+        "bitmask": lambda cells, count: BitSentence(cells, count, width)
+    }
+
+
+def time_operations(make, height, width, n, seed):
+    """
+    Build `n` random neighborhood sentences and time the subset tests,
+    differences and intersections that inference performs on them.
+    """
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(n):
+        cells = sorted(neighborhood(
+            (rng.randrange(height), rng.randrange(width)), height, width
+        ))
+        cells = rng.sample(cells, rng.randint(1, len(cells)))
+        sentences.append(make(cells, rng.randint(0, len(cells))))
+
+    # Pair every sentence with a subset of itself and a random neighbor.
+    pairs = []
+    for sentence in sentences:
+        cells = list(sentence.cells)
+        subset = make(rng.sample(cells, rng.randint(1, len(cells))), 0)
+        pairs.append((subset, sentence, rng.choice(sentences)))
+
+    start = time.perf_counter()
+    for subset, sentence, other in pairs:
+        if subset.issubset(sentence):
+            sentence.difference(subset)
+        other.issubset(sentence)
+        sentence.intersects(other)
+    return time.perf_counter() - start
+
+
+def time_games(height, width, mines, games, seed, bitsets):
+    """
+    Play seeded games with the AI and time its add_knowledge calls.
+    """
+    moves = 0
+    seconds = 0
+    for game_number in range(games):
+        random.seed(seed + game_number)
+        game = Minesweeper(height=height, width=width, mines=mines)
+        ai = MinesweeperAI(height=height, width=width, bitsets=bitsets)
+        while True:
+            move = ai.make_safe_move()
+            if move is None:
+                move = ai.make_random_move()
+            if move is None or game.is_mine(move):
+                break
+            count = game.nearby_mines(move)
+            start = time.perf_counter()
+            ai.add_knowledge(move, count)
+            seconds += time.perf_counter() - start
+            moves += 1
+    return moves, seconds
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,21 @@
+import functools
 import itertools
+import math
 import random
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Boards with more cells than this are treated as sparse: the AI never
+# tabulates or scans every cell of them
+DENSE_CELLS = 1 << 16
+
+# Seconds that exact reasoning and probable moves may spend counting
+# solutions before giving up on the components left
+TIME_BUDGET = 0.1
 
 
 class Minesweeper():
@@ -83,6 +99,200 @@ class Minesweeper():
         """
         return self.mines_found == self.mines
 
+    def reveal(self, cell, revealed=()):
+        """
+        Reveals a safe cell and, whenever a revealed cell has no nearby
+        mines, all of its neighbors too, skipping cells in `revealed`.
+
+        Returns a dictionary mapping every newly revealed cell to its number
+        of nearby mines, in the order the cells were revealed.
+        """
+        counts = dict()
+        queue = [cell]
+        while queue:
+            current = queue.pop()
+            if current in counts or current in revealed:
+                continue
+            counts[current] = self.nearby_mines(current)
+            if counts[current] == 0:
+                queue.extend(
+                    neighbor
+                    for neighbor in neighborhood(current, self.height, self.width)
+                    if neighbor not in counts and neighbor not in revealed
+                )
+        return counts
+
+
+class ArrayMinesweeper(Minesweeper):
+    """
+    Minesweeper game representation backed by NumPy arrays, for
+    simulating large boards. Mines are placed with a single draw without
+    replacement and every cell's neighboring mine count is computed up
+    front, so `nearby_mines` is an array lookup.
+    """
+
+    def __init__(self, height=8, width=8, mines=8, rng=None):
+        if np is None:
+            raise ImportError("ArrayMinesweeper requires numpy")
+
+        # Set initial width, height, and number of mines
+        self.height = height
+        self.width = width
+
+        # Seed from the random module unless a generator is given, so that
+        # random.seed() still makes games reproducible
+        if rng is None:
+            rng = np.random.default_rng(random.getrandbits(64))
+
+        # Add mines randomly
+        positions = rng.choice(height * width, size=mines, replace=False)
+        self.board = np.zeros((height, width), dtype=bool)
+        self.board.flat[positions] = True
+        self.mines = set(
+            (int(i), int(j)) for i, j in zip(*np.divmod(positions, width))
+        )
+
+        # Sum the eight shifted copies of the board to count nearby mines
+        padded = np.pad(self.board.astype(np.uint8), 1)
+        self.counts = np.zeros((height, width), dtype=np.uint8)
+        for di in range(3):
+            for dj in range(3):
+                if (di, dj) != (1, 1):
+                    self.counts += padded[di:di + height, dj:dj + width]
+
+        # At first, player has found no mines
+        self.mines_found = set()
+
+    def is_mine(self, cell):
+        return bool(self.board[cell])
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        return int(self.counts[cell])
+
+
+class SparseMinesweeper(Minesweeper):
+    """
+    Minesweeper game representation for huge boards, where mines are
+    only generated for the square chunks of the board that are looked at.
+
+    Every chunk's mines are derived from `seed` alone, so any chunk can be
+    regenerated on demand and the board holds exactly `mines` mines
+    overall without ever being stored whole. The number of mines in a
+    range of chunks is split between its two halves by a hypergeometric
+    draw seeded by the range, down to single chunks.
+    """
+
+    def __init__(self, height=1000, width=1000, mines=150000, seed=None,
+                 chunk_size=64):
+        if np is None:
+            raise ImportError("SparseMinesweeper requires numpy")
+
+        # Set initial width, height, and number of mines
+        self.height = height
+        self.width = width
+        self.mine_count = mines
+        self.seed = random.getrandbits(64) if seed is None else seed
+
+        # Chunk grid, and the chunks generated so far
+        self.chunk_size = chunk_size
+        self.chunk_rows = -(-height // chunk_size)
+        self.chunk_columns = -(-width // chunk_size)
+        self.chunks = dict()
+
+        # At first, player has found no mines
+        self.mines_found = set()
+
+    def print(self, corner=(0, 0), size=32):
+        """
+        Prints a text-based representation of where mines are located
+        in the `size` x `size` window of the board whose top-left cell is
+        `corner`, since a sparse board is too large to print whole.
+        """
+        top, left = corner
+        rows = range(top, min(top + size, self.height))
+        columns = range(left, min(left + size, self.width))
+        for i in rows:
+            print("--" * len(columns) + "-")
+            for j in columns:
+                if self.is_mine((i, j)):
+                    print("|X", end="")
+                else:
+                    print("| ", end="")
+            print("|")
+        print("--" * len(columns) + "-")
+
+    def cells_before(self, index):
+        """
+        Returns the number of board cells in chunks before chunk `index`,
+        counting chunks row by row.
+        """
+        row, column = divmod(index, self.chunk_columns)
+        rows_above = min(row * self.chunk_size, self.height)
+        rows_in_row = min(self.chunk_size, self.height - rows_above)
+        return (rows_above * self.width
+                + rows_in_row * min(column * self.chunk_size, self.width))
+
+    def chunk(self, row, column):
+        """
+        Returns the boolean mine array of a chunk, generating it if needed.
+        """
+        key = (row, column)
+        if key in self.chunks:
+            return self.chunks[key]
+
+        # Narrow the range of chunks down to this one, splitting its mines.
+        index = row * self.chunk_columns + column
+        low, high = 0, self.chunk_rows * self.chunk_columns
+        mines = self.mine_count
+        while high - low > 1:
+            middle = (low + high) // 2
+            left = self.cells_before(middle) - self.cells_before(low)
+            right = self.cells_before(high) - self.cells_before(middle)
+            rng = np.random.default_rng([self.seed, low, high])
+            left_mines = int(rng.hypergeometric(left, right, mines)) if mines else 0
+            if index < middle:
+                high, mines = middle, left_mines
+            else:
+                low, mines = middle, mines - left_mines
+
+        # Scatter this chunk's mines over its cells.
+        height = min(self.chunk_size, self.height - row * self.chunk_size)
+        width = min(self.chunk_size, self.width - column * self.chunk_size)
+        rng = np.random.default_rng([self.seed, index])
+        board = np.zeros((height, width), dtype=bool)
+        board.flat[rng.choice(height * width, size=mines, replace=False)] = True
+
+        self.chunks[key] = board
+        return board
+
+    def is_mine(self, cell):
+        i, j = cell
+        board = self.chunk(i // self.chunk_size, j // self.chunk_size)
+        return bool(board[i % self.chunk_size, j % self.chunk_size])
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        return sum(
+            self.is_mine(neighbor)
+            for neighbor in neighborhood(cell, self.height, self.width)
+        )
+
+    def won(self):
+        """
+        Checks if all mines have been flagged.
+        """
+        return (len(self.mines_found) == self.mine_count
+                and all(self.is_mine(cell) for cell in self.mines_found))
+
 
 class Sentence():
     """
@@ -96,11 +306,37 @@ class Sentence():
         self.count = count
 
     def __eq__(self, other):
-        return self.cells == other.cells and self.count == other.count
+        return (isinstance(other, Sentence)
+                and self.cells == other.cells and self.count == other.count)
+
+    def __hash__(self):
+        return hash((frozenset(self.cells), self.count))
+
+    def __len__(self):
+        return len(self.cells)
 
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def issubset(self, other):
+        """
+        Returns True if every cell of this sentence is in `other`.
+        """
+        return self.cells <= other.cells
+
+    def difference(self, other):
+        """
+        Returns the sentence about the cells of this sentence that are not
+        in `other`, assuming `other` is a subset of this sentence.
+        """
+        return Sentence(self.cells - other.cells, self.count - other.count)
+
+    def intersects(self, other):
+        """
+        Returns True if both sentences share at least one cell.
+        """
+        return not self.cells.isdisjoint(other.cells)
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
@@ -153,17 +389,164 @@ class Sentence():
         raise NotImplementedError
 
 
+class BitSentence(Sentence):
+    """
+    Sentence whose cells are stored as an integer bitmask over the board,
+    where cell (i, j) is bit i * width + j, so that subset tests,
+    differences and intersections are single integer operations.
+
+    The mask is kept shifted down by `offset`, the index of its lowest
+    cell, so it only spans the few rows the sentence touches instead of
+    the whole board.
+    """
+
+    def __init__(self, cells, count, width):
+        self.width = width
+        mask = 0
+        for i, j in cells:
+            mask |= 1 << (i * width + j)
+        self.count = count
+        self.set_mask(mask, 0)
+
+    @classmethod
+    def from_mask(cls, mask, count, width, offset=0):
+        sentence = cls((), count, width)
+        sentence.set_mask(mask, offset)
+        return sentence
+
+    def set_mask(self, mask, offset):
+        """
+        Stores `mask << offset` in normalized form.
+        """
+        if mask == 0:
+            self.mask = 0
+            self.offset = 0
+            return
+        shift = (mask & -mask).bit_length() - 1
+        self.mask = mask >> shift
+        self.offset = offset + shift
+
+    def aligned(self, other):
+        """
+        Returns the mask of `other` expressed relative to this offset.
+        Cells of `other` below this offset are dropped.
+        """
+        if other.offset >= self.offset:
+            return other.mask << (other.offset - self.offset)
+        return other.mask >> (self.offset - other.offset)
+
+    @property
+    def cells(self):
+        """
+        Returns the set of cells in the bitmask.
+        """
+        cells = set()
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            bit = low.bit_length() - 1 + self.offset
+            cells.add(divmod(bit, self.width))
+            mask ^= low
+        return cells
+
+    def __eq__(self, other):
+        return (isinstance(other, BitSentence)
+                and self.mask == other.mask
+                and self.offset == other.offset
+                and self.count == other.count)
+
+    def __hash__(self):
+        return hash((self.mask, self.offset, self.count))
+
+    def __len__(self):
+        return bin(self.mask).count("1")
+
+    def known_mines(self):
+        """
+        Returns the set of all cells in self.cells known to be mines.
+        """
+        if len(self) == self.count:
+            return self.cells
+        return set()
+
+    def known_safes(self):
+        """
+        Returns the set of all cells in self.cells known to be safe.
+        """
+        if self.count == 0:
+            return self.cells
+        return set()
+
+    def bit(self, cell):
+        """
+        Returns the bit of `cell` relative to this offset, or 0 if the
+        cell lies below it.
+        """
+        index = cell[0] * self.width + cell[1] - self.offset
+        return 1 << index if index >= 0 else 0
+
+    def mark_mine(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be a mine.
+        """
+        bit = self.bit(cell)
+        if self.mask & bit:
+            self.set_mask(self.mask ^ bit, self.offset)
+            self.count -= 1
+
+    def mark_safe(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be safe.
+        """
+        bit = self.bit(cell)
+        if self.mask & bit:
+            self.set_mask(self.mask ^ bit, self.offset)
+
+    def issubset(self, other):
+        shift = self.offset - other.offset
+        if shift < 0:
+            return self.mask == 0
+        return (self.mask << shift) & ~other.mask == 0
+
+    def difference(self, other):
+        return BitSentence.from_mask(
+            self.mask & ~self.aligned(other), self.count - other.count,
+            self.width, self.offset
+        )
+
+    def intersects(self, other):
+        shift = other.offset - self.offset
+        if shift >= 0:
+            return self.mask & (other.mask << shift) != 0
+        return (self.mask << -shift) & other.mask != 0
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, bitsets=False, mine_count=None):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Total number of mines on the board, if known
+        self.mine_count = mine_count
+
+        # Whether sentences store their cells as bitmasks
+        self.bitsets = bitsets
+
+        # Cells around every cell, shared by all AIs for this board size,
+        # unless the board is too large to tabulate
+        if height * width <= DENSE_CELLS:
+            self.neighbors = neighbor_table(height, width)
+        else:
+            self.neighbors = None
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -171,8 +554,52 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Safe cells that have not been chosen yet
+        self.safe_moves = set()
+
+        # Set of sentences about the game known to be true,
+        # and the sentences every cell appears in.
+        self.knowledge = set()
+        self.sentences_by_cell = dict()
+
+        # Sentences that may allow new inferences.
+        self.pending = []
+
+        # Solutions counted for the components of the knowledge base,
+        # keyed by their sentences, so they are only counted once.
+        self.counted = dict()
+
+    def new_sentence(self, cells, count):
+        """
+        Returns a sentence of the kind this AI was configured to use.
+        """
+        if self.bitsets:
+            return BitSentence(cells, count, self.width)
+        return Sentence(cells, count)
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base and indexes it by cell,
+        unless it is empty or already known.
+        """
+        if len(sentence) == 0 or sentence in self.knowledge:
+            return
+        self.knowledge.add(sentence)
+        for cell in sentence.cells:
+            self.sentences_by_cell.setdefault(cell, set()).add(sentence)
+        self.pending.append(sentence)
+
+    def remove_sentence(self, sentence):
+        """
+        Removes a sentence from the knowledge base and the cell index.
+        """
+        self.knowledge.discard(sentence)
+        for cell in sentence.cells:
+            sentences = self.sentences_by_cell.get(cell)
+            if sentences is not None:
+                sentences.discard(sentence)
+                if not sentences:
+                    del self.sentences_by_cell[cell]
 
     def mark_mine(self, cell):
         """
@@ -180,8 +607,10 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        for sentence in list(self.sentences_by_cell.get(cell, ())):
+            self.remove_sentence(sentence)
             sentence.mark_mine(cell)
+            self.add_sentence(sentence)
 
     def mark_safe(self, cell):
         """
@@ -189,8 +618,12 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        if cell not in self.moves_made:
+            self.safe_moves.add(cell)
+        for sentence in list(self.sentences_by_cell.get(cell, ())):
+            self.remove_sentence(sentence)
             sentence.mark_safe(cell)
+            self.add_sentence(sentence)
 
     def add_knowledge(self, cell, count):
         """
@@ -208,42 +641,69 @@ class MinesweeperAI():
                if they can be inferred from existing knowledge
         """
 
-        new_safes = set()
-        new_mines = set()
-        
-
-        # Marks cell as a move that has been made.
-        self.moves_made.add(cell)
+        self.add_knowledge_batch([(cell, count)])
 
-        # Marks cell as safe and removes cell from any sentence in knowledge.
-        if cell not in self.safes:
-            self.mark_safe(cell)
-   
-        # Add a new sentence to the AI's knowledge base with valid surrounding cells.
-        self.knowledge.append(Sentence(self.valid_surroundings(cell), count))
-
-        # Iterates through all sentences in AI's knowledge base for new known safe or mine cells.
-        for sentence in self.knowledge:
-            new_safes.update(sentence.known_safes())
-            new_mines.update(sentence.known_mines())
+        return None
 
-        # Marks all new safe and mine cells.
-        for safe_cell in new_safes:
-            self.mark_safe(safe_cell)
-        for mine_cell in new_mines:
-            self.mark_mine(mine_cell)
+    def add_knowledge_batch(self, facts):
+        """
+        Adds knowledge for many revealed cells at once, such as a whole
+        opening revealed by Minesweeper.reveal(), given as (cell, count)
+        pairs. Inference only runs once all the facts are in.
+        """
+        facts = list(facts)
+
+        # Marks every cell as a move that has been made and as safe.
+        for cell, _ in facts:
+            self.moves_made.add(cell)
+            self.safe_moves.discard(cell)
+            if cell not in self.safes:
+                self.mark_safe(cell)
+
+        # Add a new sentence with the valid surrounding cells, leaving out known mines.
+        for cell, count in facts:
+            surroundings = self.valid_surroundings(cell)
+            known_mines = surroundings & self.mines
+            self.add_sentence(self.new_sentence(surroundings - known_mines, count - len(known_mines)))
+
+        # Draws every conclusion reachable from the sentences that changed.
+        self.infer()
+
+        # Falls back to exact reasoning when no safe move can be derived.
+        if self.make_safe_move() is None:
+            safes, mines, _ = self.solve(time.perf_counter() + TIME_BUDGET)
+            for safe_cell in safes:
+                self.mark_safe(safe_cell)
+            for mine_cell in mines:
+                self.mark_mine(mine_cell)
+            self.infer()
 
-        # Removes sentences with no cells.
-        for sentence in self.knowledge:
-            if len(sentence.cells) == 0:
-                self.knowledge.remove(sentence)
+        return None
 
-        #adds infered sentences to AI's knowledge base
-        self.knowledge += self.inferences()
+    def infer(self):
+        """
+        Processes pending sentences until no new conclusions follow.
 
-        return None
-    
-        raise NotImplementedError
+        Each pending sentence may reveal known safes or mines, and is
+        compared only against the sentences sharing one of its cells.
+        """
+        while self.pending:
+            sentence = self.pending.pop()
+            if sentence not in self.knowledge:
+                continue
+
+            # Marks cells whose value follows from the sentence alone.
+            safes = sentence.known_safes()
+            mines = sentence.known_mines()
+            if safes or mines:
+                for safe_cell in list(safes):
+                    self.mark_safe(safe_cell)
+                for mine_cell in list(mines):
+                    self.mark_mine(mine_cell)
+                continue
+
+            for inferred in self.subset_inferences(sentence):
+                self.add_sentence(inferred)
 
     def make_safe_move(self):
         """
@@ -254,11 +714,9 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        if len(self.safes) > 0:
-            for move in self.safes:
-                if move not in self.moves_made:
-                    return move
-        
+        for move in self.safe_moves:
+            return move
+
         return None
 
         raise NotImplementedError
@@ -270,21 +728,143 @@ class MinesweeperAI():
             1) have not already been chosen, and
             2) are not known to be mines
         """
-        # Stores random moves already checked.
-        searched = []
+        return self.random_cell()
 
-        # Iterates through all posible moves in the board.
-        while len(searched) <= self.height * self.width:
-            move = (random.randint(0, self.width - 1), random.randint(0, self.height - 1))
-            if move not in self.mines and move not in self.moves_made:
-                print(move)
-                return move
-            else:
-                searched.append(move)
+    def unknown_cells(self):
+        """
+        Returns a list of all cells that have not been chosen
+        and are not known to be mines.
+        """
+        return [
+            (i, j)
+            for i in range(self.height)
+            for j in range(self.width)
+            if (i, j) not in self.moves_made and (i, j) not in self.mines
+        ]
 
-        return None
+    def random_cell(self, excluded=()):
+        """
+        Returns a random cell that has not been chosen, is not known to be
+        a mine and is not in `excluded`, or None if there is none.
 
-        raise NotImplementedError
+        Large boards are sampled a few times before falling back to a scan,
+        so the cost does not grow with the board while most of it is unknown.
+        """
+        def available(cell):
+            return (cell not in self.moves_made and cell not in self.mines
+                    and cell not in excluded)
+
+        if self.height * self.width > DENSE_CELLS:
+            for _ in range(64):
+                cell = (random.randrange(self.height),
+                        random.randrange(self.width))
+                if available(cell):
+                    return cell
+
+        moves = [cell for cell in self.unknown_cells() if cell not in excluded]
+        if not moves:
+            return None
+        return random.choice(moves)
+
+    def make_probable_move(self, time_budget=TIME_BUDGET):
+        """
+        Returns the unchosen cell least likely to be a mine, or None if
+        there are no cells left to choose or all of them must be mines.
+
+        Probabilities come from counting the consistent mine assignments
+        of every component of the knowledge base, weighted by how many ways
+        the remaining mines fit in the unconstrained cells, with the total
+        number of mines estimated when it is not known. Components that
+        cannot be counted within `time_budget` seconds are treated as
+        unconstrained.
+        """
+        probabilities, other_probability, others = self.mine_probabilities(
+            time.perf_counter() + time_budget
+        )
+        for cell in self.safe_moves:
+            probabilities[cell] = 0
+
+        lowest = min(probabilities.values(), default=1)
+        if others and other_probability < lowest:
+            return self.random_cell(excluded=probabilities)
+        if lowest >= 1:
+            return None
+        return random.choice([
+            cell for cell, probability in probabilities.items()
+            if probability == lowest
+        ])
+
+    def mine_probabilities(self, deadline=None):
+        """
+        Estimates the probability that each unknown cell is a mine.
+
+        Returns a tuple (probabilities, other_probability, others): a
+        dictionary for the cells constrained by knowledge, the probability
+        shared by every other unknown cell, and how many such cells remain.
+        Only the constrained cells are materialized, so this stays cheap on
+        boards far larger than the revealed area.
+        """
+        # Counts the solutions of every component in time.
+        components = [
+            results for results in self.component_solutions(deadline)
+            if results
+        ]
+
+        frontier = set()
+        for results in components:
+            frontier.update(next(iter(results.values()))[1])
+        others = (self.height * self.width - len(self.safes)
+                  - len(self.mines) - len(frontier))
+
+        # Without the total number of mines, it is estimated from the
+        # density of mines on the part of the board seen so far.
+        density = self.mine_density(components)
+        if self.mine_count is None:
+            mine_count = round(density * self.height * self.width)
+        else:
+            mine_count = self.mine_count
+        remaining = mine_count - len(self.mines)
+
+        probabilities = dict()
+        weights = global_weights(components, others, remaining)
+
+        for results, weight in zip(components, weights["components"]):
+            total = sum(
+                solutions * weight[mines]
+                for mines, (solutions, _) in results.items()
+            )
+            for cell in next(iter(results.values()))[1]:
+                hits = sum(
+                    counts[cell] * weight[mines]
+                    for mines, (_, counts) in results.items()
+                )
+                probabilities[cell] = hits / total if total else 0.5
+
+        # Unconstrained cells share the mines left outside the frontier.
+        if weights["others"] is not None:
+            other_probability = weights["others"]
+        else:
+            other_probability = density
+
+        return probabilities, other_probability, others
+
+    def mine_density(self, components):
+        """
+        Estimates the share of cells that are mines from the cells known
+        to be safe or mines and the frontier cells of `components`, each
+        of whose solutions counts equally. Returns 0.5 when nothing is
+        known yet.
+        """
+        cells = len(self.mines) + len(self.safes)
+        mines = len(self.mines)
+        for results in components:
+            total = sum(solutions for solutions, _ in results.values())
+            mines += sum(
+                count * solutions
+                for count, (solutions, _) in results.items()
+            ) / total
+            cells += len(next(iter(results.values()))[1])
+        return mines / cells if cells else 0.5
 
     def in_board(self, i, j):
         """
@@ -299,10 +879,10 @@ class MinesweeperAI():
         if j < 0:
             return False
         # East limit crossed.
-        if i >= self.width:
+        if i >= self.height:
             return False
         # North limit crossed.
-        if j >= self.height:
+        if j >= self.width:
             return False
 
         return True
@@ -315,45 +895,337 @@ class MinesweeperAI():
             - not known mine cell.
             - not a known safe cell.
         """
-        valid = set()
-
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-                if (i, j) != cell and self.in_board(i, j):
-                    valid.add((i, j))
-        valid -= self.safes | self.moves_made
-
-        return valid
+        if self.neighbors is not None:
+            neighbors = self.neighbors[cell[0]][cell[1]]
+        else:
+            neighbors = neighborhood(cell, self.height, self.width)
+        return set(
+            neighbor for neighbor in neighbors
+            if neighbor not in self.safes and neighbor not in self.moves_made
+        )
+
+    def subset_inferences(self, sentence):
+        """
+        Returns the sentences inferred from `sentence` and every sentence
+        sharing a cell with it, where one is a subset of the other.
+        """
+        inferences = []
+        others = set()
+        for cell in sentence.cells:
+            others.update(self.sentences_by_cell.get(cell, ()))
+        others.discard(sentence)
+
+        for other in others:
+            if sentence.issubset(other):
+                inferences.append(other.difference(sentence))
+            elif other.issubset(sentence):
+                inferences.append(sentence.difference(other))
+
+        return [
+            inferred for inferred in inferences
+            if inferred not in self.knowledge
+        ]
 
     def inferences(self):
         """
         Returns all new posible inferences.
         """
-        inferences = []
-        new_sentences = []
-        old_sentences = []
-
-        # Compares each sentence in knowledge with all others to infere new sentences.
-        for sentence1 in self.knowledge:
-            if len(sentence1.cells) != 0:
-                for sentence2 in self.knowledge:
-                    if len(sentence2.cells) != 0 and sentence1 != sentence2 and sentence1.cells <= sentence2.cells:
-                        inferences.append(
-                            Sentence(sentence2.cells - sentence1.cells, sentence2.count - sentence1.count)
-                        )
-
-        #Checks for repeated sentences. 
-        old_sentences = [
-            repeated 
-            for repeated in inferences 
-            if repeated in self.knowledge
-        ]
+        new_sentences = set()
+        for sentence in self.knowledge:
+            new_sentences.update(self.subset_inferences(sentence))
 
-        # Gets
-        new_sentences  = [
-            new
-            for new in inferences
-            if new not in old_sentences
-        ]
+        return list(new_sentences)
+
+    def components(self):
+        """
+        Splits the sentences in the knowledge base into independent
+        groups, where two sentences are in the same group when they are
+        linked by a chain of shared cells.
+        """
+        components = []
+        visited = set()
+        for start in self.knowledge:
+            if start in visited:
+                continue
+            visited.add(start)
+            component = []
+            queue = [start]
+            while queue:
+                sentence = queue.pop()
+                component.append(sentence)
+                for cell in sentence.cells:
+                    for neighbor in self.sentences_by_cell[cell]:
+                        if neighbor not in visited:
+                            visited.add(neighbor)
+                            queue.append(neighbor)
+            components.append(component)
+
+        return components
+
+    def component_solutions(self, deadline=None):
+        """
+        Returns count_solutions() of every component of the knowledge base,
+        or None for components that cannot be counted before `deadline`.
 
-        return new_sentences
\ No newline at end of file
+        Results are kept until the knowledge base changes, so a guess that
+        follows exact reasoning does not count the same components again.
+        """
+        counted = dict()
+        solutions = []
+        for component in self.components():
+            key = frozenset(
+                (frozenset(sentence.cells), sentence.count)
+                for sentence in component
+            )
+            results = self.counted.get(key)
+            if results is None:
+                results = self.count_solutions(component, deadline)
+            if results is not None:
+                counted[key] = results
+            solutions.append(results)
+        self.counted = counted
+
+        return solutions
+
+    def count_solutions(self, sentences, deadline=None):
+        """
+        Enumerates every mine assignment to the cells of `sentences` that
+        satisfies all of them, by backtracking with pruning.
+
+        Cells that appear in exactly the same sentences are interchangeable,
+        so they are assigned together as a group and weighted by the number
+        of ways to choose their mines.
+
+        Returns a dictionary mapping each possible number of mines to a pair
+        (solutions, mine_counts), where mine_counts maps every cell to the
+        number of those solutions in which it is a mine. Returns None when
+        `deadline` (a time.perf_counter() value) passes first.
+        """
+        # Groups cells by the sentences containing them.
+        membership = dict()
+        for index, sentence in enumerate(sentences):
+            for cell in sentence.cells:
+                membership.setdefault(cell, []).append(index)
+        groups = dict()
+        for cell, indices in membership.items():
+            groups.setdefault(tuple(indices), []).append(cell)
+        groups = sorted(groups.items())
+
+        # Mines still needed and unassigned cells left in every sentence.
+        needed = [sentence.count for sentence in sentences]
+        free = [len(sentence.cells) for sentence in sentences]
+
+        assigned = [0] * len(groups)
+        results = dict()
+        steps = 0
+
+        def backtrack(position, mines, weight):
+            nonlocal steps
+            steps += 1
+            if deadline is not None and steps % 1024 == 0:
+                if time.perf_counter() > deadline:
+                    raise TimeoutError
+
+            if position == len(groups):
+                result = results.setdefault(mines, [0, [0] * len(groups)])
+                result[0] += weight
+                for index, (_, cells) in enumerate(groups):
+                    result[1][index] += weight * assigned[index] // len(cells)
+                return
+
+            indices, cells = groups[position]
+            size = len(cells)
+            low = max([0] + [needed[i] - (free[i] - size) for i in indices])
+            high = min([size] + [needed[i] for i in indices])
+
+            for i in indices:
+                free[i] -= size
+            for count in range(low, high + 1):
+                assigned[position] = count
+                for i in indices:
+                    needed[i] -= count
+                backtrack(
+                    position + 1, mines + count,
+                    weight * math.comb(size, count)
+                )
+                for i in indices:
+                    needed[i] += count
+            for i in indices:
+                free[i] += size
+
+        try:
+            backtrack(0, 0, 1)
+        except TimeoutError:
+            return None
+
+        return {
+            mines: (solutions, {
+                cell: mine_counts[index]
+                for index, (_, cells) in enumerate(groups)
+                for cell in cells
+            })
+            for mines, (solutions, mine_counts) in results.items()
+        }
+
+    def solve(self, deadline=None):
+        """
+        Runs exact reasoning over each independent component of the
+        knowledge base.
+
+        Returns a tuple (safes, mines, probabilities) with the cells that
+        are safe or mines in every consistent assignment, and a dictionary
+        with the fraction of consistent assignments in which each
+        constrained cell is a mine. Components that cannot be solved before
+        `deadline` are left out.
+        """
+        safes = set()
+        mines = set()
+        probabilities = dict()
+
+        for results in self.component_solutions(deadline):
+            if not results:
+                continue
+
+            total = sum(solutions for solutions, _ in results.values())
+            for cell in results[next(iter(results))][1]:
+                hits = sum(counts[cell] for _, counts in results.values())
+                probabilities[cell] = hits / total
+                if hits == 0:
+                    safes.add(cell)
+                elif hits == total:
+                    mines.add(cell)
+
+        return safes - self.safes, mines - self.mines, probabilities
+
+
+def neighborhood(cell, height, width):
+    """
+    Returns the frozenset of cells within one row and column of `cell`
+    that are inside the board, not including `cell` itself.
+    """
+    i, j = cell
+    return frozenset(
+        (x, y)
+        for x in range(max(i - 1, 0), min(i + 2, height))
+        for y in range(max(j - 1, 0), min(j + 2, width))
+        if (x, y) != cell
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def neighbor_table(height, width):
+    """
+    Returns an immutable table where table[i][j] is
+    neighborhood((i, j), height, width).
+    """
+    return tuple(
+        tuple(neighborhood((i, j), height, width) for j in range(width))
+        for i in range(height)
+    )
+
+
+def convolve(a, b):
+    """
+    Returns the distribution of the total number of mines of two
+    independent parts, given the weight of each mine count in each part.
+    """
+    result = dict()
+    for i, x in a.items():
+        for j, y in b.items():
+            result[i + j] = result.get(i + j, 0) + x * y
+    return result
+
+
+def global_weights(components, others, remaining):
+    """
+    Weights the solutions of each component by the number of ways the rest
+    of the board can hold the remaining mines.
+
+    `components` is a list of count_solutions() results, `others` the
+    number of unconstrained cells and `remaining` the number of mines not
+    yet found, or None when unknown.
+
+    Returns a dictionary with a weight for every mine count of every
+    component under "components", and the probability that an
+    unconstrained cell is a mine under "others" (None when unknown).
+    """
+    distributions = [
+        {mines: solutions for mines, (solutions, _) in results.items()}
+        for results in components
+    ]
+
+    if remaining is None:
+        return {
+            "components": [
+                {mines: 1 for mines in distribution}
+                for distribution in distributions
+            ],
+            "others": None
+        }
+
+    # Scale every distribution to a maximum of one, which leaves
+    # probabilities unchanged and keeps the products below within floats
+    distributions = [
+        {
+            mines: solutions / max(distribution.values())
+            for mines, solutions in distribution.items()
+        }
+        for distribution in distributions
+    ]
+
+    def log_fill(mines):
+        """Log of the ways to place `mines` among unconstrained cells."""
+        return (math.lgamma(others + 1) - math.lgamma(mines + 1)
+                - math.lgamma(others - mines + 1))
+
+    # Work relative to the largest count that can occur, since counts like
+    # C(10^6, 10^5) are far beyond float range
+    most = sum(max(distribution) for distribution in distributions)
+    possible = [
+        remaining - mines for mines in range(most + 1)
+        if 0 <= remaining - mines <= others
+    ]
+    if not possible:
+        return global_weights(components, others, None)
+    base = max(log_fill(mines) for mines in possible)
+
+    def fill(mines):
+        """Ways to place `mines` among the unconstrained cells, scaled."""
+        if mines < 0 or mines > others:
+            return 0
+        return math.exp(log_fill(mines) - base)
+
+    # Distribution of all components except one, via prefix and suffix sums.
+    prefix = [{0: 1}]
+    for distribution in distributions:
+        prefix.append(convolve(prefix[-1], distribution))
+    suffix = [{0: 1}]
+    for distribution in reversed(distributions):
+        suffix.append(convolve(suffix[-1], distribution))
+    suffix.reverse()
+
+    weights = []
+    for index, distribution in enumerate(distributions):
+        rest = convolve(prefix[index], suffix[index + 1])
+        weights.append({
+            mines: sum(
+                count * fill(remaining - mines - rest_mines)
+                for rest_mines, count in rest.items()
+            )
+            for mines in distribution
+        })
+
+    # Expected share of the remaining mines among unconstrained cells.
+    total = sum(
+        count * fill(remaining - mines) for mines, count in prefix[-1].items()
+    )
+    if total == 0:
+        return global_weights(components, others, None)
+    if others == 0:
+        return {"components": weights, "others": 0}
+    expected = sum(
+        count * fill(remaining - mines) * (remaining - mines)
+        for mines, count in prefix[-1].items()
+    )
+
+    return {"components": weights, "others": expected / total / others}
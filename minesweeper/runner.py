@@ -1,5 +1,7 @@
 import pygame
+import queue
 import sys
+import threading
 import time
 
 from minesweeper import Minesweeper, MinesweeperAI
@@ -17,6 +19,7 @@ WHITE = (255, 255, 255)
 pygame.init()
 size = width, height = 600, 400
 screen = pygame.display.set_mode(size)
+clock = pygame.time.Clock()
 
 # Fonts
 OPEN_SANS = "assets/fonts/OpenSans-Regular.ttf"
@@ -37,9 +40,37 @@ flag = pygame.transform.scale(flag, (cell_size, cell_size))
 mine = pygame.image.load("assets/images/mine.png")
 mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
+# Rectangles of every cell on the board
+cells = [
+    [
+        pygame.Rect(
+            board_origin[0] + j * cell_size,
+            board_origin[1] + i * cell_size,
+            cell_size, cell_size
+        )
+        for j in range(WIDTH)
+    ]
+    for i in range(HEIGHT)
+]
+
+# Panel buttons
+aiButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
+    (width / 3) - BOARD_PADDING * 2, 50
+)
+resetButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
+    (width / 3) - BOARD_PADDING * 2, 50
+)
+autoButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 90,
+    (width / 3) - BOARD_PADDING * 2, 50
+)
+panel = pygame.Rect((2 / 3) * width, 0, width / 3, height)
+
 # Create game and AI agent
 game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mine_count=MINES)
 
 # Keep track of revealed cells, flagged cells, and if a mine was hit
 revealed = set()
@@ -49,6 +80,101 @@ lost = False
 # Show instructions initially
 instructions = True
 
+# AI jobs run on a worker thread, which reports chosen moves back
+ai_jobs = queue.Queue()
+ai_results = queue.Queue()
+ai_thinking = False
+autoplay = False
+
+# Redraw everything on the next frame, or only the cells that changed
+full_redraw = True
+dirty = set()
+
+
+def ai_worker():
+    """
+    Runs AI jobs in order, so that inference never blocks drawing.
+
+    A ("knowledge", ai, counts) job adds the nearby mine counts of newly
+    revealed cells to `ai`, and a
+    ("move", ai) job chooses a move and puts (ai, move, mines) on the
+    results queue, where mines are the cells `ai` knows to be mines.
+    """
+    while True:
+        job = ai_jobs.get()
+        if job[0] == "knowledge":
+            _, agent, counts = job
+            agent.add_knowledge_batch(counts.items())
+        elif job[0] == "move":
+            agent = job[1]
+            move = agent.make_safe_move()
+            if move is None:
+                move = agent.make_probable_move()
+                if move is None:
+                    print("No moves left to make.")
+                else:
+                    print("No known safe moves, AI making least risky move.")
+            else:
+                print("AI making safe move.")
+            ai_results.put((agent, move, agent.mines.copy()))
+
+
+threading.Thread(target=ai_worker, daemon=True).start()
+
+
+def draw_cell(i, j):
+    """
+    Draws a single cell and returns its rectangle.
+    """
+    rect = cells[i][j]
+    pygame.draw.rect(screen, GRAY, rect)
+    pygame.draw.rect(screen, WHITE, rect, 3)
+
+    # Add a mine, flag, or number if needed
+    if game.is_mine((i, j)) and lost:
+        screen.blit(mine, rect)
+    elif (i, j) in flags:
+        screen.blit(flag, rect)
+    elif (i, j) in revealed:
+        neighbors = smallFont.render(
+            str(game.nearby_mines((i, j))),
+            True, BLACK
+        )
+        neighborsTextRect = neighbors.get_rect()
+        neighborsTextRect.center = rect.center
+        screen.blit(neighbors, neighborsTextRect)
+
+    return rect
+
+
+def draw_button(rect, label):
+    """
+    Draws a button with a centered label.
+    """
+    buttonText = mediumFont.render(label, True, BLACK)
+    buttonRect = buttonText.get_rect()
+    buttonRect.center = rect.center
+    pygame.draw.rect(screen, WHITE, rect)
+    screen.blit(buttonText, buttonRect)
+
+
+def draw_panel():
+    """
+    Draws the buttons and game status next to the board.
+    """
+    pygame.draw.rect(screen, BLACK, panel)
+    draw_button(aiButton, "AI Move")
+    draw_button(resetButton, "Reset")
+    draw_button(autoButton, "Stop" if autoplay else "Auto Play")
+
+    # Display text
+    text = "Lost" if lost else "Won" if game.mines == flags else ""
+    text = mediumFont.render(text, True, WHITE)
+    textRect = text.get_rect()
+    textRect.center = ((5 / 6) * width, (5 / 6) * height)
+    screen.blit(text, textRect)
+
+
 while True:
 
     # Check if game quit
@@ -56,10 +182,9 @@ while True:
         if event.type == pygame.QUIT:
             sys.exit()
 
-    screen.fill(BLACK)
-
     # Show game instructions
     if instructions:
+        screen.fill(BLACK)
 
         # Title
         title = largeFont.render("Play Minesweeper", True, WHITE)
@@ -93,74 +218,29 @@ while True:
             mouse = pygame.mouse.get_pos()
             if buttonRect.collidepoint(mouse):
                 instructions = False
+                full_redraw = True
                 time.sleep(0.3)
 
         pygame.display.flip()
+        clock.tick(60)
         continue
 
-    # Draw board
-    cells = []
-    for i in range(HEIGHT):
-        row = []
-        for j in range(WIDTH):
-
-            # Draw rectangle for cell
-            rect = pygame.Rect(
-                board_origin[0] + j * cell_size,
-                board_origin[1] + i * cell_size,
-                cell_size, cell_size
-            )
-            pygame.draw.rect(screen, GRAY, rect)
-            pygame.draw.rect(screen, WHITE, rect, 3)
-
-            # Add a mine, flag, or number if needed
-            if game.is_mine((i, j)) and lost:
-                screen.blit(mine, rect)
-            elif (i, j) in flags:
-                screen.blit(flag, rect)
-            elif (i, j) in revealed:
-                neighbors = smallFont.render(
-                    str(game.nearby_mines((i, j))),
-                    True, BLACK
-                )
-                neighborsTextRect = neighbors.get_rect()
-                neighborsTextRect.center = rect.center
-                screen.blit(neighbors, neighborsTextRect)
-
-            row.append(rect)
-        cells.append(row)
-
-    # AI Move button
-    aiButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("AI Move", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = aiButton.center
-    pygame.draw.rect(screen, WHITE, aiButton)
-    screen.blit(buttonText, buttonRect)
-
-    # Reset button
-    resetButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("Reset", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = resetButton.center
-    pygame.draw.rect(screen, WHITE, resetButton)
-    screen.blit(buttonText, buttonRect)
-
-    # Display text
-    text = "Lost" if lost else "Won" if game.mines == flags else ""
-    text = mediumFont.render(text, True, WHITE)
-    textRect = text.get_rect()
-    textRect.center = ((5 / 6) * width, (2 / 3) * height)
-    screen.blit(text, textRect)
-
     move = None
 
+    # Collect a move computed by the AI, ignoring results for a reset game
+    try:
+        agent, ai_move, ai_mines = ai_results.get_nowait()
+    except queue.Empty:
+        agent = None
+    if agent is ai:
+        ai_thinking = False
+        if ai_move is None:
+            flags = ai_mines
+            autoplay = False
+            full_redraw = True
+        elif ai_move not in revealed:
+            move = ai_move
+
     left, _, right = pygame.mouse.get_pressed()
 
     # Check for a right-click to toggle flagging
@@ -173,32 +253,35 @@ while True:
                         flags.remove((i, j))
                     else:
                         flags.add((i, j))
+                    full_redraw = True
                     time.sleep(0.2)
 
-    elif left == 1:
+    elif left == 1 and move is None:
         mouse = pygame.mouse.get_pos()
 
-        # If AI button clicked, make an AI move
+        # If AI button clicked, ask the AI for a move
         if aiButton.collidepoint(mouse) and not lost:
-            move = ai.make_safe_move()
-            if move is None:
-                move = ai.make_random_move()
-                if move is None:
-                    flags = ai.mines.copy()
-                    print("No moves left to make.")
-                else:
-                    print("No known safe moves, AI making random move.")
-            else:
-                print("AI making safe move.")
+            if not ai_thinking:
+                ai_jobs.put(("move", ai))
+                ai_thinking = True
+            time.sleep(0.2)
+
+        # Toggle solving the game to completion
+        elif autoButton.collidepoint(mouse) and not lost:
+            autoplay = not autoplay
+            full_redraw = True
             time.sleep(0.2)
 
         # Reset game state
         elif resetButton.collidepoint(mouse):
             game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+            ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mine_count=MINES)
             revealed = set()
             flags = set()
             lost = False
+            ai_thinking = False
+            autoplay = False
+            full_redraw = True
             continue
 
         # User-made move
@@ -210,13 +293,34 @@ while True:
                             and (i, j) not in revealed):
                         move = (i, j)
 
-    # Make move and update AI knowledge
+    # Make move and update AI knowledge in the background
     if move:
         if game.is_mine(move):
             lost = True
+            autoplay = False
+            full_redraw = True
         else:
-            nearby = game.nearby_mines(move)
-            revealed.add(move)
-            ai.add_knowledge(move, nearby)
+            counts = game.reveal(move, revealed)
+            revealed.update(counts)
+            dirty.update(counts)
+            ai_jobs.put(("knowledge", ai, counts))
+
+    # Keep asking for moves while solving to completion
+    if autoplay and not ai_thinking and not lost:
+        ai_jobs.put(("move", ai))
+        ai_thinking = True
+
+    # Redraw the whole screen only when needed, otherwise changed cells
+    if full_redraw:
+        screen.fill(BLACK)
+        for i in range(HEIGHT):
+            for j in range(WIDTH):
+                draw_cell(i, j)
+        draw_panel()
+        pygame.display.flip()
+        full_redraw = False
+    elif dirty:
+        pygame.display.update([draw_cell(i, j) for i, j in dirty])
+    dirty.clear()
 
-    pygame.display.flip()
+    clock.tick(60)
@@ -0,0 +1,139 @@
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from minesweeper import (
+    DENSE_CELLS, ArrayMinesweeper, Minesweeper, MinesweeperAI,
+    SparseMinesweeper
+)
+
+# Board height, width and number of mines for each difficulty
+LEVELS = {
+    "beginner": (9, 9, 10),
+    "intermediate": (16, 16, 40),
+    "expert": (16, 30, 99),
+    "huge": (1000, 1000, 150000)
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play seeded Minesweeper games with the AI, headless."
+    )
+    parser.add_argument("--levels", nargs="+",
+                        default=["beginner", "intermediate", "expert"],
+                        choices=list(LEVELS))
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes to play games in (default: serial)")
+    parser.add_argument("--numpy", action="store_true",
+                        help="use the NumPy-backed board")
+    parser.add_argument("--max-moves", type=int, default=None,
+                        help="stop each game after this many moves")
+    parser.add_argument("--hide-mine-count", action="store_true",
+                        help="play without telling the AI the number of mines")
+    args = parser.parse_args()
+
+    for level in args.levels:
+        height, width, mines = LEVELS[level]
+        stats = simulate(height, width, mines, args.games, args.seed,
+                         args.workers, args.numpy, args.max_moves,
+                         not args.hide_mine_count)
+        print(f"{level} ({height}x{width}, {mines} mines)")
+        print(f"  Win rate: {stats['wins'] / stats['games']:.2%} "
+              f"({stats['wins']}/{stats['games']})")
+        print(f"  Moves per second: {stats['moves'] / stats['seconds']:.0f}")
+        print(f"  Time in add_knowledge: {stats['knowledge_seconds']:.3f}s "
+              f"of {stats['seconds']:.3f}s")
+
+
+def play(height, width, mines, seed, numpy=False, max_moves=None,
+         mine_count=True):
+    """
+    Play one game with the AI until it wins, hits a mine or makes
+    `max_moves` moves. Boards too large to store densely use the sparse
+    board. Unless `mine_count` is false, the AI is told how many mines
+    there are.
+
+    Return a dictionary with whether the game was won, the number of moves
+    made, the total time taken and the time spent in add_knowledge.
+    """
+    random.seed(seed)
+    if height * width > DENSE_CELLS:
+        game = SparseMinesweeper(height=height, width=width, mines=mines,
+                                 seed=seed)
+    elif numpy:
+        game = ArrayMinesweeper(height=height, width=width, mines=mines)
+    else:
+        game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width,
+                       mine_count=mines if mine_count else None)
+
+    safe_cells = height * width - mines
+    revealed = set()
+    moves = 0
+    knowledge_seconds = 0
+    won = False
+
+    start = time.perf_counter()
+    while True:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_probable_move()
+        if move is None or game.is_mine(move):
+            break
+        moves += 1
+        counts = game.reveal(move, revealed)
+        revealed.update(counts)
+
+        knowledge_start = time.perf_counter()
+        ai.add_knowledge_batch(counts.items())
+        knowledge_seconds += time.perf_counter() - knowledge_start
+
+        if len(revealed) == safe_cells:
+            won = True
+            break
+        if moves == max_moves:
+            break
+
+    return {
+        "won": won,
+        "moves": moves,
+        "seconds": time.perf_counter() - start,
+        "knowledge_seconds": knowledge_seconds
+    }
+
+
+def simulate(height, width, mines, games, seed=0, workers=None,
+             numpy=False, max_moves=None, mine_count=True):
+    """
+    Play `games` games seeded from `seed` onwards, optionally spread over
+    a pool of `workers` processes, and return aggregate statistics.
+    """
+    seeds = range(seed, seed + games)
+    arguments = (
+        [height] * games, [width] * games, [mines] * games, seeds,
+        [numpy] * games, [max_moves] * games, [mine_count] * games
+    )
+
+    if workers:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(play, *arguments, chunksize=16))
+    else:
+        results = list(map(play, *arguments))
+
+    return {
+        "games": games,
+        "wins": sum(result["won"] for result in results),
+        "moves": sum(result["moves"] for result in results),
+        "seconds": sum(result["seconds"] for result in results),
+        "knowledge_seconds": sum(
+            result["knowledge_seconds"] for result in results
+        )
+    }
+
+
+if __name__ == "__main__":
+    main()
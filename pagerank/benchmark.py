@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from graph import METHODS, Graph, power_iteration, sample
+from outofcore import stream_pagerank
+from pagerank import DAMPING, crawl
+
+CORPORA = ["corpus0", "corpus1", "corpus2"]
+
+# L1 change at which the reference solver, plain Jacobi iteration, stops
+REFERENCE_TOLERANCE = 1e-13
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare PageRank engines in time, accuracy and memory."
+    )
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10000, 100000],
+                        help="page counts of synthetic graphs")
+    parser.add_argument("--links", type=int, default=8,
+                        help="average links of a synthetic page")
+    parser.add_argument("--dangling", type=float, default=0.2,
+                        help="share of synthetic pages without links")
+    parser.add_argument("--tolerance", type=float, default=1e-8,
+                        help="L1 change at which iterative engines stop")
+    parser.add_argument("--error", type=float, default=0.05,
+                        help="L1 error sampling has to reach")
+    parser.add_argument("--max-samples", type=int, default=1 << 26)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.json")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    graphs = [(corpus, Graph.from_corpus(crawl(corpus))) for corpus in CORPORA]
+    for n in args.sizes:
+        graphs.append((
+            f"synthetic-{n}",
+            preferential_attachment(n, args.links, args.dangling, rng)
+        ))
+
+    results = []
+    for name, graph in graphs:
+        print(f"{name} ({len(graph)} pages, {len(graph.indices)} links, "
+              f"{int(graph.dangling.sum())} dangling)")
+        reference = power_iteration(
+            graph, DAMPING, method="jacobi",
+            tolerance=REFERENCE_TOLERANCE
+        )
+        for result in run(graph, reference, args, rng):
+            result.update(
+                graph=name, pages=len(graph), links=len(graph.indices),
+                dangling=int(graph.dangling.sum())
+            )
+            results.append(result)
+            counts = f"{result['iterations']} iterations" \
+                if result["samples"] is None else f"{result['samples']} samples"
+            print(f"  {result['engine']}: {result['seconds']:.4f}s, {counts}, "
+                  f"L1 error {result['error']:.2e}, "
+                  f"{result['memory'] / (1 << 20):.1f} MiB")
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+
+def preferential_attachment(n, links, dangling, rng):
+    """
+    Generate a web-like graph of `n` pages where each page that is not
+    dangling links to about `links` earlier pages, chosen with
+    probability proportional to 1 + their number of incoming links, and
+    a share `dangling` of pages has no links at all.
+
+    Pages are added in batches that double in size, and a batch only
+    attaches to pages and links added before it.
+    """
+    degree = rng.geometric(1 / (links + 1), size=n) - 1
+    degree[rng.random(n) < dangling] = 0
+    degree[0] = 0
+    targets = []
+    # Every earlier link target, so that choosing one uniformly chooses a
+    # page in proportion to its incoming links
+    endpoints = np.zeros(0, dtype=np.int64)
+
+    start = 1
+    while start < n:
+        end = min(n, 2 * start)
+        count = int(degree[start:end].sum())
+
+        # Choosing among pages and earlier endpoints in one draw weights
+        # every page by 1 + its incoming links
+        choice = rng.random(count) * (start + len(endpoints))
+        uniform = choice < start
+        batch = np.empty(count, dtype=np.int64)
+        batch[uniform] = choice[uniform].astype(np.int64)
+        if len(endpoints):
+            copied = (choice[~uniform] - start).astype(np.int64)
+            batch[~uniform] = endpoints[copied]
+
+        targets.append(batch)
+        endpoints = np.concatenate((endpoints, batch))
+        start = end
+
+    # Links of a page are sorted and distinct, as in a crawled corpus
+    indices = np.concatenate(targets) if targets else np.zeros(0, dtype=np.int64)
+    sources = np.repeat(np.arange(n), degree)
+    pairs = np.unique(sources * n + indices)
+    sources, indices = pairs // n, pairs % n
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(sources, minlength=n))
+    return Graph([f"{i}.html" for i in range(n)], indptr, indices)
+
+
+def measure(function):
+    """
+    Call `function` and return a tuple (result, seconds, peak bytes
+    allocated during the call).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run(graph, reference, args, rng):
+    """
+    Run every engine on `graph` and return a list of result dictionaries
+    with the engine name, wall time, iterations or samples, L1 error
+    against `reference`, and peak memory.
+    """
+    results = []
+
+    def record(engine, rank, seconds, memory, iterations=None, samples=None):
+        results.append(dict(
+            engine=engine, seconds=seconds, iterations=iterations,
+            samples=samples, error=float(np.abs(rank - reference).sum()),
+            memory=memory
+        ))
+
+    # The default tolerance of iterate_pagerank
+    residuals = []
+    rank, seconds, memory = measure(lambda: power_iteration(
+        graph, DAMPING, residuals=residuals
+    ))
+    record("iterate (default)", rank, seconds, memory, len(residuals))
+
+    for method in METHODS:
+        residuals = []
+        graph.tables.clear()
+        rank, seconds, memory = measure(lambda: power_iteration(
+            graph, DAMPING, method=method, tolerance=args.tolerance,
+            residuals=residuals
+        ))
+        record(method, rank, seconds, memory, len(residuals))
+
+    descriptor, path = tempfile.mkstemp(suffix=".graph")
+    os.close(descriptor)
+    try:
+        graph.save(path)
+        residuals = []
+        rank, seconds, memory = measure(lambda: stream_pagerank(
+            path, DAMPING, tolerance=args.tolerance, residuals=residuals
+        ))
+        record("out-of-core", rank, seconds, memory, len(residuals))
+    finally:
+        os.remove(path)
+
+    # Double the samples until sampling is as accurate as asked
+    n = 1000
+    while True:
+        graph.tables.clear()
+        rank, seconds, memory = measure(lambda: sample(
+            graph, DAMPING, n, rng=rng
+        ))
+        error = np.abs(rank - reference).sum()
+        if error <= args.error or 2 * n > args.max_samples:
+            record("sample", rank, seconds, memory, samples=n)
+            break
+        n *= 2
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
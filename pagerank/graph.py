@@ -0,0 +1,431 @@
+import struct
+
+import numpy as np
+
+# Header of a saved graph: magic, number of pages, number of links, and
+# number of bytes of page names
+GRAPH_MAGIC = b"PRGRAPH1"
+GRAPH_HEADER = struct.Struct("<8sQQQ")
+
+
+class Graph():
+    """
+    Link graph of a corpus in compressed sparse row (CSR) form.
+
+    Pages are numbered by their position in `pages`. The links of page i
+    are indices[indptr[i]:indptr[i + 1]]. Pages with no links are
+    "dangling": a surfer on them jumps to any page uniformly at random.
+    """
+
+    def __init__(self, pages, indptr, indices):
+        self.pages = list(pages)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+
+        self.out_degree = np.diff(self.indptr)
+        self.dangling = self.out_degree == 0
+
+        # Source page of every link
+        self.sources = np.repeat(
+            np.arange(len(self.pages), dtype=np.int32), self.out_degree
+        )
+
+        # Transition tables already built, by damping factor
+        self.tables = {}
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build a graph from a dictionary mapping each page to the set of
+        pages it links to, as returned by `crawl`.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        indptr = [0]
+        indices = []
+        for page in pages:
+            indices.extend(sorted(index[link] for link in corpus[page]))
+            indptr.append(len(indices))
+        return cls(pages, indptr, indices)
+
+    def save(self, path):
+        """
+        Write the graph to `path` in the format of `write_graph`.
+        """
+        write_graph(path, self.pages, [(self.out_degree, self.indices)])
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a graph written by `save`. The link arrays are memory-mapped,
+        so they are read from disk only as they are used.
+        """
+        indptr, indices, offsets, table = map_graph(path)
+        return cls(page_names(offsets, table), indptr, indices)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def links(self, i):
+        """
+        Return the indices of the pages linked to by page `i`.
+        """
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def transitions(self, damping_factor):
+        """
+        Return the TransitionTable of this graph for `damping_factor`,
+        building it only the first time it is asked for.
+        """
+        if damping_factor not in self.tables:
+            self.tables[damping_factor] = TransitionTable(self, damping_factor)
+        return self.tables[damping_factor]
+
+    def ranks(self, vector):
+        """
+        Return a dictionary mapping each page to its value in `vector`.
+        """
+        return {page: float(value) for page, value in zip(self.pages, vector)}
+
+
+def write_graph(path, pages, chunks):
+    """
+    Write a link graph to `path` in a compact binary format: a header,
+    then the CSR arrays `indptr` (int64) and `indices` (int32), then the
+    offsets (int64) of every page name in a UTF-8 name table, and the
+    table itself. Every array starts at a multiple of 8 bytes.
+
+    `chunks` yields tuples (degrees, indices) for consecutive runs of
+    pages: the number of links of every page in the run, and their
+    targets in page order. Links are streamed to disk chunk by chunk.
+    """
+    indptr = np.zeros(len(pages) + 1, dtype=np.int64)
+    with open(path, "wb") as file:
+
+        # Leave room for the header and indptr, which are known at the end
+        file.seek(GRAPH_HEADER.size + indptr.nbytes)
+        page = 0
+        for degrees, indices in chunks:
+            indptr[page + 1:page + 1 + len(degrees)] = (
+                indptr[page] + np.cumsum(degrees)
+            )
+            page += len(degrees)
+            file.write(np.asarray(indices, dtype=np.int32).tobytes())
+        if page != len(pages):
+            raise ValueError(f"links given for {page} of {len(pages)} pages")
+        file.write(bytes(-file.tell() % 8))
+
+        names = [page.encode() for page in pages]
+        offsets = np.zeros(len(names) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(name) for name in names])
+        file.write(offsets.tobytes())
+        file.write(b"".join(names))
+
+        file.seek(0)
+        file.write(GRAPH_HEADER.pack(
+            GRAPH_MAGIC, len(pages), int(indptr[-1]), int(offsets[-1])
+        ))
+        file.write(indptr.tobytes())
+
+
+def map_graph(path):
+    """
+    Memory-map the arrays of a graph written by `write_graph`, and return
+    them as a tuple (indptr, indices, offsets, table).
+    """
+    with open(path, "rb") as file:
+        magic, pages, links, size = GRAPH_HEADER.unpack(
+            file.read(GRAPH_HEADER.size)
+        )
+    if magic != GRAPH_MAGIC:
+        raise ValueError(f"{path} is not a saved graph")
+
+    def array(dtype, count, offset):
+        """Map `count` values of `dtype` at byte `offset` of the file."""
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", offset=offset,
+                         shape=(count,))
+
+    arrays = []
+    offset = GRAPH_HEADER.size
+    for dtype, count in ((np.int64, pages + 1), (np.int32, links),
+                         (np.int64, pages + 1), (np.uint8, size)):
+        arrays.append(array(dtype, count, offset))
+        offset += count * np.dtype(dtype).itemsize
+        offset += -offset % 8
+    return tuple(arrays)
+
+
+def page_names(offsets, table):
+    """
+    Return the list of page names stored in a name table, given the
+    offsets of the names in it.
+    """
+    table = table.tobytes()
+    return [
+        table[start:end].decode()
+        for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
+
+
+def page_name(offsets, table, i):
+    """
+    Return the name of page `i` in a name table, decoding only that name.
+    """
+    return bytes(table[int(offsets[i]):int(offsets[i + 1])]).decode()
+
+
+class TransitionTable():
+    """
+    Probabilities of a random surfer's next page on a link graph.
+
+    From a page with links, the surfer moves to each linked page with
+    probability `follow[i]` = damping_factor / out-degree, and to every
+    page (linked or not) with probability `jump[i]` = (1 - damping_factor)
+    / N. From a dangling page it moves to every page with probability
+    `jump[i]` = 1 / N, so all dangling pages share the one uniform row.
+    """
+
+    def __init__(self, graph, damping_factor):
+        self.graph = graph
+        self.damping_factor = damping_factor
+        n = len(graph)
+
+        self.follow = np.zeros(n)
+        linked = ~graph.dangling
+        self.follow[linked] = damping_factor / graph.out_degree[linked]
+        self.jump = np.where(graph.dangling, 1 / n, (1 - damping_factor) / n)
+
+        # Probability carried by every link
+        self.weights = self.follow[graph.sources]
+
+        self.uniform = np.full(n, 1 / n)
+        self.uniform.flags.writeable = False
+
+        self.links_by_target = None
+
+    def __len__(self):
+        return len(self.graph)
+
+    def row(self, i):
+        """
+        Return a tuple (links, follow, jump) for page `i`: the pages it
+        links to, the probability of moving to each of them through a
+        link, and the probability of jumping to any given page.
+        """
+        return self.graph.links(i), self.follow[i], self.jump[i]
+
+    def distribution(self, i):
+        """
+        Return the probability of moving from page `i` to every page. The
+        returned array is shared, read-only, for dangling pages.
+        """
+        if self.graph.dangling[i]:
+            return self.uniform
+        links, follow, jump = self.row(i)
+        distribution = np.full(len(self), jump)
+        distribution[links] += follow
+        return distribution
+
+    def apply(self, rank):
+        """
+        Return the distribution of a surfer's next page, given that its
+        current page is distributed according to `rank`.
+        """
+        received = np.bincount(
+            self.graph.indices, weights=rank[self.graph.sources] * self.weights,
+            minlength=len(self)
+        )
+        return received + (rank * self.jump).sum()
+
+    def incoming(self):
+        """
+        Return a tuple (targets, sources, weights, inptr) of the links
+        sorted by the page they point to, so that the links into page i
+        are at positions inptr[i]:inptr[i + 1].
+        """
+        if self.links_by_target is None:
+            graph = self.graph
+            order = np.argsort(graph.indices, kind="stable")
+            targets = graph.indices[order]
+            inptr = np.concatenate(
+                ([0], np.cumsum(np.bincount(targets, minlength=len(self))))
+            )
+            self.links_by_target = (
+                targets, graph.sources[order], self.weights[order], inptr
+            )
+        return self.links_by_target
+
+    def step(self, position, rng):
+        """
+        Return the next pages of surfers currently on pages `position`.
+        """
+        graph = self.graph
+        count = len(position)
+        degree = graph.out_degree[position]
+        follow = (rng.random(count) < self.damping_factor) & (degree > 0)
+        if not follow.any():
+            return rng.integers(len(self), size=count)
+        link = graph.indptr[position] + (rng.random(count) * degree).astype(np.int64)
+        linked = graph.indices[np.where(follow, link, 0)]
+        return np.where(follow, linked, rng.integers(len(self), size=count))
+
+
+# Number of iterations between quadratic extrapolation steps
+EXTRAPOLATION_PERIOD = 10
+
+# L1 change of the rank vector in one iteration at which iteration stops
+TOLERANCE = 1e-6
+
+
+def power_iteration(graph, damping_factor, tolerance=TOLERANCE, start=None,
+                    method="jacobi", max_iterations=None, residuals=None):
+    """
+    Return the PageRank vector of `graph` by repeatedly applying the
+    PageRank formula, starting from `start` (uniform by default).
+
+    `method` is one of:
+      "jacobi": update every page at once from the previous iteration.
+      "gauss-seidel": update the pages in blocks, each block using the
+        ranks the earlier blocks already updated in the same sweep.
+      "extrapolated": Jacobi with a quadratic extrapolation from the last
+        four iterates every EXTRAPOLATION_PERIOD iterations.
+
+    Iteration stops when the L1 norm of the change in one iteration is at
+    most `tolerance`, which does not depend on the number of pages, or
+    after `max_iterations` iterations if given. If `residuals` is a list,
+    the L1 change of every iteration is appended to it.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown method: {method}")
+    n = len(graph)
+    if start is None:
+        rank = np.full(n, 1 / n)
+    else:
+        rank = np.asarray(start, dtype=np.float64)
+
+    update = METHODS[method](graph.transitions(damping_factor))
+    iterations = 0
+    while max_iterations is None or iterations < max_iterations:
+        new_rank = update(rank)
+        residual = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        iterations += 1
+        if residuals is not None:
+            residuals.append(float(residual))
+        if residual <= tolerance:
+            break
+    return rank
+
+
+def jacobi(table):
+    """
+    Return a function that applies the PageRank formula to every page of
+    the graph of TransitionTable `table` at once.
+    """
+    return table.apply
+
+
+def gauss_seidel(table, blocks=64):
+    """
+    Return a function that sweeps over the graph of TransitionTable
+    `table` in up to `blocks` blocks of consecutive pages, applying the
+    PageRank formula to one block at a time with the newest ranks of all
+    other pages.
+    """
+    n = len(table)
+    targets, sources, weights, inptr = table.incoming()
+    bounds = np.linspace(0, n, min(blocks, n) + 1).astype(np.int64)
+
+    def update(rank):
+        rank = rank.copy()
+        jumped = (rank * table.jump).sum()
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            links = slice(inptr[start], inptr[end])
+            received = np.bincount(
+                targets[links] - start,
+                weights=rank[sources[links]] * weights[links],
+                minlength=end - start
+            )
+            block = received + jumped
+            jumped += ((block - rank[start:end]) * table.jump[start:end]).sum()
+            rank[start:end] = block
+        return rank / rank.sum()
+
+    return update
+
+
+def extrapolated(table):
+    """
+    Return a function that applies the PageRank formula to every page of
+    the graph of TransitionTable `table` at once, and periodically
+    replaces the result with a quadratic extrapolation of the last four
+    iterates, which cancels the slowest decaying components of the error.
+    """
+    step = jacobi(table)
+    history = []
+    iterations = 0
+
+    def update(rank):
+        nonlocal iterations
+        history.append(rank)
+        del history[:-3]
+        iterations += 1
+        new_rank = step(rank)
+        if iterations % EXTRAPOLATION_PERIOD == 0:
+            x0, x1, x2 = history
+            y = np.column_stack((x1 - x0, x2 - x0))
+            gamma = np.linalg.lstsq(y, -(new_rank - x0), rcond=None)[0]
+            beta0 = gamma[0] + gamma[1] + 1
+            beta1 = gamma[1] + 1
+            candidate = beta0 * x1 + beta1 * x2 + new_rank
+            if np.isfinite(candidate).all() and (candidate > 0).all():
+                new_rank = candidate / candidate.sum()
+        return new_rank
+
+    return update
+
+
+METHODS = {
+    "jacobi": jacobi,
+    "gauss-seidel": gauss_seidel,
+    "extrapolated": extrapolated,
+}
+
+
+def sample(graph, damping_factor, n, surfers=1024, rng=None):
+    """
+    Return PageRank values estimated from `n` pages visited by `surfers`
+    independent random surfers that walk the graph in parallel.
+
+    With probability `damping_factor` a surfer follows one of the links of
+    its page, chosen uniformly, and otherwise (or on a dangling page) jumps
+    to any page uniformly at random. Surfers start on random pages and walk
+    until the influence of their starting page is negligible before their
+    visits are counted.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    table = graph.transitions(damping_factor)
+    pages = len(graph)
+    surfers = max(1, min(surfers, n))
+
+    # A surfer forgets its start once it is likely to have jumped at least
+    # once; after k steps the start still matters with probability d^k.
+    position = rng.integers(pages, size=surfers)
+    if 0 < damping_factor < 1:
+        burn_in = int(np.ceil(np.log(1e-6) / np.log(damping_factor)))
+        for _ in range(burn_in):
+            position = table.step(position, rng)
+
+    samples = np.empty(n, dtype=np.int64)
+    taken = 0
+    while taken < n:
+        count = min(surfers, n - taken)
+        samples[taken:taken + count] = position[:count]
+        taken += count
+        position = table.step(position, rng)
+
+    return np.bincount(samples, minlength=pages) / n
@@ -0,0 +1,112 @@
+import argparse
+
+import numpy as np
+
+from graph import TOLERANCE, map_graph, page_name
+from pagerank import DAMPING
+
+# Number of links read from disk at a time
+BLOCK_LINKS = 1 << 22
+
+# Number of top-ranked pages to print
+TOP = 10
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rank a saved graph without loading its links."
+    )
+    parser.add_argument("graph", help="graph saved by `Graph.save`")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="L1 change at which iteration stops")
+    parser.add_argument("--max-iterations", type=int, default=None)
+    args = parser.parse_args()
+
+    residuals = []
+    rank = stream_pagerank(
+        args.graph, DAMPING, tolerance=args.tolerance,
+        max_iterations=args.max_iterations, residuals=residuals
+    )
+    if residuals:
+        print(f"{len(residuals)} iterations, last L1 change {residuals[-1]:.2e}")
+
+    # Only the names of the pages printed are decoded
+    _, _, offsets, table = map_graph(args.graph)
+    top = np.argsort(-rank, kind="stable")[:TOP]
+    print(f"Top {len(top)} PageRank Results from Streaming Iteration")
+    for i in top:
+        print(f"  {page_name(offsets, table, i)}: {rank[i]:.4f}")
+
+
+def blocks(indptr, block_links):
+    """
+    Split the pages of a graph with CSR offsets `indptr` into runs of
+    consecutive pages with about `block_links` links each, and return a
+    list of (start, end) page ranges. A page with more links than that
+    is a run of its own.
+    """
+    n = len(indptr) - 1
+    bounds = []
+    start = 0
+    while start < n:
+        end = np.searchsorted(indptr, indptr[start] + block_links, side="right") - 1
+        end = min(max(end, start + 1), n)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def stream_pagerank(path, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=None, residuals=None, block_links=None):
+    """
+    Return the PageRank vector of the graph saved at `path` by `Graph.save`
+    without loading its links into memory.
+
+    Every iteration is one sequential pass over the links on disk, which
+    are stored sorted by source page and read in blocks of `block_links`
+    links (by default BLOCK_LINKS, or the number of pages if larger, so
+    that accumulating a block costs no more than reading it). Only the
+    rank vectors and the out-degree of every page are kept in memory.
+
+    Stopping works as in `power_iteration`: when the L1 change in one
+    iteration is at most `tolerance`, or after `max_iterations`. If
+    `residuals` is a list, the L1 change of every iteration is appended.
+    """
+    indptr, indices, _, _ = map_graph(path)
+    indptr = np.array(indptr)
+    n = len(indptr) - 1
+    if block_links is None:
+        block_links = max(BLOCK_LINKS, n)
+
+    out_degree = np.diff(indptr)
+    dangling = out_degree == 0
+    share = np.zeros(n)
+    share[~dangling] = 1 / out_degree[~dangling]
+    runs = blocks(indptr, block_links)
+
+    rank = np.full(n, 1 / n)
+    iterations = 0
+    while max_iterations is None or iterations < max_iterations:
+        received = np.zeros(n)
+        for start, end in runs:
+            targets = np.asarray(indices[indptr[start]:indptr[end]])
+            weights = np.repeat(rank[start:end] * share[start:end],
+                                out_degree[start:end])
+            received += np.bincount(targets, weights=weights, minlength=n)
+
+        new_rank = (1 - damping_factor) / n + damping_factor * (
+            received + rank[dangling].sum() / n
+        )
+        residual = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        iterations += 1
+        if residuals is not None:
+            residuals.append(float(residual))
+        if residual <= tolerance:
+            break
+
+    return rank
+
+
+if __name__ == "__main__":
+    main()
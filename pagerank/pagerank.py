@@ -1,18 +1,35 @@
+import collections
+import mmap
 import os
 import random
 import re
 import sys
-import copy
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import numpy as np
 
+from graph import TOLERANCE, Graph, power_iteration, sample
+
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Pattern of a link target in an HTML page
+LINK = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Files at least this large are memory-mapped instead of read
+MMAP_SIZE = 1 << 20
+
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python pagerank.py corpus [graph]")
+
+    # A saved graph is ranked as is, and a crawl can be saved for next time
+    if os.path.isfile(sys.argv[1]):
+        corpus = Graph.load(sys.argv[1])
+    else:
+        corpus = crawl(sys.argv[1], graph=True,
+                       save=sys.argv[2] if len(sys.argv) == 3 else None)
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
@@ -23,22 +40,33 @@ def main():
         print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, workers=None, graph=False, save=None):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+
+    With `workers`, files are read on a pool of that many threads and
+    parsed on a pool of that many processes. With `graph`, return the
+    link graph as a `Graph` instead of a dictionary. With `save`, also
+    write the link graph to that path (see `Graph.save`).
     """
-    pages = dict()
+    filenames = [
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".html")
+    ]
 
     # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+    if workers:
+        links = crawl_parallel(directory, filenames, workers)
+    else:
+        links = map(extract_file_links, [
+            os.path.join(directory, filename) for filename in filenames
+        ])
+    pages = dict()
+    for filename, page_links in zip(filenames, links):
+        page_links.discard(filename)
+        pages[filename] = page_links
 
     # Only include links to other pages in the corpus
     for filename in pages:
@@ -47,142 +75,187 @@ def crawl(directory):
             if link in pages
         )
 
+    if graph or save:
+        link_graph = Graph.from_corpus(pages)
+        if save:
+            link_graph.save(save)
+        if graph:
+            return link_graph
     return pages
 
 
-def transition_model(corpus, page, damping_factor):
+def extract_links(contents):
     """
-    Return a probability distribution over which page to visit next,
-    given a current page.
-
-    With probability `damping_factor`, choose a link at random
-    linked to by `page`. With probability `1 - damping_factor`, choose
-    a link at random chosen from all pages in the corpus.
+    Return the set of link targets in HTML `contents`, given as bytes or
+    any buffer such as a memory map.
     """
-    distribution = dict()
+    return set(
+        match.group(1).decode("utf-8", errors="replace")
+        for match in LINK.finditer(contents)
+    )
 
-    # Iterates through corpus to add probability(1 - alpha) equaly to all pages in corpus.
-    for key in corpus:
-        distribution[key] = (1 - damping_factor) / len(corpus)
 
+def extract_file_links(path):
+    """
+    Return the set of link targets in the HTML file at `path`. Large files
+    are memory-mapped and scanned in place rather than read into memory.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < MMAP_SIZE:
+            return extract_links(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+            return extract_links(contents)
 
-    # Iterates through corpus to find the desired page(key) and adds probability(alpha) equaly to each link found in page(key).
-    for key, link_list in corpus.items():
-        if len(link_list) != 0:
-            if key == page:
-                for link in link_list:
-                    distribution[link] += damping_factor / len(link_list)
 
-                return distribution
-        else: # when link_list is empty.
-            for key in corpus:
-                distribution[key] += damping_factor / len(corpus)
+def extract_batch_links(batch):
+    """
+    Return the sets of link targets of a list of HTML file contents.
+    """
+    return [extract_links(contents) for contents in batch]
 
-            return distribution
 
-    
-            
-    raise NotImplementedError
+def extract_files_links(paths):
+    """
+    Return the sets of link targets of a list of HTML files.
+    """
+    return [extract_file_links(path) for path in paths]
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def read_small_file(path):
     """
-    Return PageRank values for each page by sampling `n` pages
-    according to transition model, starting with a page at random.
-
-    Return a dictionary where keys are page names, and values are
-    their estimated PageRank value (a value between 0 and 1). All
-    PageRank values should sum to 1.
+    Return the contents of the file at `path`, or None if it is large
+    enough to be memory-mapped by the parser instead.
     """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_SIZE:
+            return None
+        return f.read()
 
-    sample_list = []
-    distribution = {}
-    
-    # Creates first samlpe at random.
-    sample_list.append(random.choice(list(corpus.keys())))
-
-    # Populaates sample_list with n items.
-    for i in range(n):
-        link_list= []
-        probability_list = []
 
-        distribution = transition_model(corpus, sample_list[i], damping_factor)
-        for i, j in distribution.items():
-            link_list.append(i)
-            probability_list.append(j)
+def crawl_parallel(directory, filenames, workers, batch_size=256):
+    """
+    Return the set of link targets of every file in `filenames`, in order.
+
+    Threads read small files a batch at a time, and each batch of contents
+    is parsed by worker processes while the next one is read. At most
+    2 * `workers` batches are waiting to be parsed, so that reading never
+    gets far ahead of parsing and memory does not grow with the corpus.
+    Large files are parsed by the worker processes straight from a memory
+    map.
+    """
+    paths = [os.path.join(directory, filename) for filename in filenames]
+    links = [None] * len(paths)
+    pending = collections.deque()
+
+    def collect():
+        """Wait for the oldest pending batch and store its links."""
+        positions, future = pending.popleft()
+        for position, page_links in zip(positions, future.result()):
+            links[position] = page_links
+
+    with ThreadPoolExecutor(max_workers=workers) as readers, \
+            ProcessPoolExecutor(max_workers=workers) as parsers:
+        for start in range(0, len(paths), batch_size):
+            positions = range(start, min(start + batch_size, len(paths)))
+            contents = list(readers.map(
+                read_small_file, [paths[position] for position in positions]
+            ))
+            while len(pending) >= 2 * workers:
+                collect()
+
+            batch = [
+                (position, data) for position, data in zip(positions, contents)
+                if data is not None
+            ]
+            if batch:
+                pending.append(([p for p, _ in batch], parsers.submit(
+                    extract_batch_links, [c for _, c in batch]
+                )))
+            for position, data in zip(positions, contents):
+                if data is None:
+                    pending.append(([position], parsers.submit(
+                        extract_files_links, [paths[position]]
+                    )))
+        while pending:
+            collect()
+
+    return links
 
-        sample_list.append(np.random.choice(link_list, p = probability_list))
 
-    rank = copy.deepcopy(corpus)
+def transition_model(corpus, page, damping_factor):
+    """
+    Return a probability distribution over which page to visit next,
+    given a current page.
 
-    # Set up rank key's item == to 0 for later count apparence in sample_list.
-    for key in rank:
-        rank[key] = 0
+    With probability `damping_factor`, choose a link at random
+    linked to by `page`. With probability `1 - damping_factor`, choose
+    a link at random chosen from all pages in the corpus.
+    """
+    # A Graph keeps a TransitionTable with every page's row
+    if isinstance(corpus, Graph):
+        table = corpus.transitions(damping_factor)
+        return corpus.ranks(table.distribution(corpus.index[page]))
+
+    # Otherwise only `page`'s links are needed, and a page without links
+    # links to every page, itself included
+    links = corpus[page]
+    if not links:
+        return {key: 1 / len(corpus) for key in corpus}
+    distribution = {key: (1 - damping_factor) / len(corpus) for key in corpus}
+    for link in links:
+        distribution[link] += damping_factor / len(links)
+    return distribution
+
+
+def corpus_graph(corpus):
+    """
+    Return the Graph of `corpus`, which is either a dictionary as returned
+    by `crawl` or already a Graph. A Graph is a snapshot, so rank the same
+    corpus many times by building its Graph once and passing that.
+    """
+    if isinstance(corpus, Graph):
+        return corpus
+    return Graph.from_corpus(corpus)
 
-    # Counts how many copies of each page(key) there are in the samples.
-    for key in sample_list:
-        rank[key] += 1
 
-    # Converts count of apperance in probability.
-    for key in rank:
-        rank[key] = rank[key] / n
+def sample_pagerank(corpus, damping_factor, n):
+    """
+    Return PageRank values for each page by sampling `n` pages
+    according to transition model, starting with a page at random.
 
-    return rank
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
 
-    raise NotImplementedError
+    graph = corpus_graph(corpus)
+    rng = np.random.default_rng(random.getrandbits(64))
+    return graph.ranks(sample(graph, damping_factor, n, rng=rng))
 
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, method="jacobi",
+                     tolerance=TOLERANCE, max_iterations=None, residuals=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
 
+    `method` selects the solver ("jacobi", "gauss-seidel" or
+    "extrapolated"). Iteration stops once the L1 change in one iteration
+    is at most `tolerance` or after `max_iterations` iterations. If
+    `residuals` is a list, the L1 change of every iteration is appended
+    to it.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
 
-    rank = copy.deepcopy(corpus)
-    treshold = 0.001
-    avg_displacement = treshold + 1
-
-    #sets initial rank of all pages to 1/N.
-    for page in rank:
-        rank[page] = 1 / len(corpus)
-
-    # Calculates PageRank until treshold is met.
-    while avg_displacement > treshold:
-        past_rank = copy.deepcopy(rank)
-        displacement = copy.deepcopy(corpus) # Will contain absolute value of displacement of probability  for each page.
-        sum = 0 
-
-        # iterates through corpus to calculate PR(p).
-        for page in corpus:
-            sigma_ratio = 0
-
-            # Iterates thtough corpus to find keys(pages) where page(p) is a link to calculate the sum of ratios (PR(i) / NumLinks(i)).
-            for key, link_list in corpus.items():
-                if page != key:
-                    if len(link_list) != 0:
-                        for link in link_list:
-                            if page == link:
-                                sigma_ratio += rank[key] / len(link_list)
-                    else:
-                        sigma_ratio += rank[key] / len(corpus)
-
-            rank[page] = ((1 - damping_factor) / len(corpus)) + (damping_factor * sigma_ratio)
-
-        # Calculates displacement of probability for every page in corpus for later use calculating avg displacement.
-        for page in past_rank:
-            displacement[page] = abs(rank[page] - past_rank[page])
-            sum += displacement[page]
-
-        avg_displacement = sum / len(corpus)        
-
-    return rank
-    
+    graph = corpus_graph(corpus)
+    return graph.ranks(power_iteration(
+        graph, damping_factor, method=method, tolerance=tolerance,
+        max_iterations=max_iterations, residuals=residuals
+    ))
 
-    raise NotImplementedError
 
 if __name__ == "__main__":
     main()
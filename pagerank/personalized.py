@@ -0,0 +1,211 @@
+import sys
+
+import numpy as np
+
+from graph import Graph
+from pagerank import DAMPING, SAMPLES, crawl
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit("Usage: python personalized.py corpus page [page ...]")
+    corpus = crawl(sys.argv[1])
+    graph = Graph.from_corpus(corpus)
+    seeds = sys.argv[2:]
+    for page in seeds:
+        if page not in graph.index:
+            sys.exit(f"{page} is not in the corpus")
+
+    teleport = teleport_vectors(graph, [seeds])
+    rank = personalized_pagerank(graph, DAMPING, teleport)[:, 0]
+    print(f"Personalized PageRank Results from Iteration ({', '.join(seeds)})")
+    for page, value in sorted(graph.ranks(rank).items()):
+        print(f"  {page}: {value:.4f}")
+
+    segments = WalkSegments(graph)
+    rank = segments.estimate(DAMPING, teleport, SAMPLES)[:, 0]
+    print(f"Personalized PageRank Results from Walk Segments (n = {SAMPLES})")
+    print("  (estimates, with L1 error of about 1 / sqrt(n))")
+    for page, value in sorted(graph.ranks(rank).items()):
+        print(f"  {page}: {value:.4f}")
+
+
+def teleport_vectors(graph, seed_sets):
+    """
+    Return an N x K matrix whose k-th column is the uniform distribution
+    over the pages in the k-th of `seed_sets`.
+    """
+    teleport = np.zeros((len(graph), len(seed_sets)))
+    for k, seeds in enumerate(seed_sets):
+        pages = [graph.index[page] for page in seeds]
+        teleport[pages, k] = 1 / len(pages)
+    return teleport
+
+
+def personalized_pagerank(graph, damping_factor, teleport, tolerance=1e-6,
+                          max_iterations=None):
+    """
+    Return the PageRank vectors of `graph` for every column of `teleport`.
+
+    A surfer follows one of the links of its page with probability
+    `damping_factor`, and otherwise (or on a dangling page) jumps to a page
+    drawn from its teleport distribution. With a uniform teleport
+    distribution this is ordinary PageRank.
+
+    `teleport` is either one distribution over the pages, or an N x K
+    matrix with one distribution per column, which are iterated together.
+    A column stops being updated once its L1 change in one iteration is at
+    most `tolerance`, and all stop after `max_iterations`.
+    """
+    teleport = np.asarray(teleport, dtype=np.float64)
+    vector = teleport.ndim == 1
+    if vector:
+        teleport = teleport[:, np.newaxis]
+
+    table = graph.transitions(damping_factor)
+    targets, sources, weights, inptr = table.incoming()
+    receiving = np.flatnonzero(np.diff(inptr))
+    starts = inptr[receiving]
+
+    # Share of a page's rank that leaves it by jumping
+    jump = table.jump * len(graph)
+
+    # One row per vector, so that every vector's ranks are contiguous
+    teleport = teleport.T.copy()
+    rank = teleport.copy()
+    active = np.arange(len(rank))
+    iterations = 0
+    while len(active) and (max_iterations is None or iterations < max_iterations):
+        block = rank[active]
+        new_block = teleport[active] * (block @ jump)[:, np.newaxis]
+        if len(targets):
+            for row, new_row in zip(block, new_block):
+                new_row[receiving] += np.add.reduceat(row[sources] * weights, starts)
+        rank[active] = new_block
+        iterations += 1
+        active = active[np.abs(new_block - block).sum(axis=1) > tolerance]
+
+    return rank[0] if vector else rank.T
+
+
+class WalkSegments():
+    """
+    Precomputed random walks for Monte Carlo personalized PageRank.
+
+    For every page, `walks` independent walks of up to `length` steps that
+    only follow links are stored, ending early at dangling pages. Walks of
+    any length are then stitched together from stored segments, so that
+    estimating personalized vectors mostly reads walks instead of taking
+    them.
+    """
+
+    def __init__(self, graph, walks=8, length=8, rng=None):
+        if rng is None:
+            rng = np.random.default_rng()
+        self.graph = graph
+        self.length = length
+
+        # segments[i, w] are the pages of the w-th walk from page i, or -1
+        # once the walk has reached a dangling page
+        n = len(graph)
+        starts = np.repeat(np.arange(n, dtype=np.int64), walks)
+        self.segments = self.walk(starts, rng).reshape(n, walks, length + 1)
+
+    def walk(self, starts, rng):
+        """
+        Return a new walk of up to `length` steps from each page in
+        `starts`, one row of pages per walk, padded with -1.
+        """
+        graph = self.graph
+        walks = np.full((len(starts), self.length + 1), -1, dtype=np.int32)
+        position = np.asarray(starts, dtype=np.int64)
+        walks[:, 0] = position
+        for t in range(1, self.length + 1):
+            alive = position >= 0
+            degree = np.zeros_like(position)
+            degree[alive] = graph.out_degree[position[alive]]
+            alive &= degree > 0
+            link = graph.indptr[position[alive]] + (
+                rng.random(alive.sum()) * degree[alive]
+            ).astype(np.int64)
+            position = np.full_like(position, -1)
+            position[alive] = graph.indices[link]
+            walks[:, t] = position
+        return walks
+
+    def estimate(self, damping_factor, teleport, n, rng=None):
+        """
+        Return estimated PageRank vectors for every column of `teleport`,
+        as in `personalized_pagerank`, each from about `n` surfer visits.
+
+        Every visit belongs to an episode that starts on a page drawn from
+        the teleport distribution and follows links until it jumps, which
+        happens after a geometrically distributed number of steps, or until
+        it reaches a dangling page. Episodes are read off segments,
+        continuing from the last page of a segment while they last longer.
+
+        Within one estimate every stored segment is used at most once, and
+        a fresh walk is taken whenever a page's stored walks run out, so
+        the episodes are independent and the L1 error falls as about
+        1 / sqrt(n). Reusing stored segments instead would leave an error
+        floor set by the number of stored walks, that no `n` could lower.
+        More stored walks only mean fewer fresh ones.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        teleport = np.asarray(teleport, dtype=np.float64)
+        vector = teleport.ndim == 1
+        if vector:
+            teleport = teleport[:, np.newaxis]
+
+        pages = len(self.graph)
+        steps = np.arange(self.length + 1)
+        estimates = np.zeros(teleport.shape)
+
+        # An episode visits 1 / (1 - d) pages on average
+        episodes = max(1, int(np.ceil(n * (1 - damping_factor))))
+        for k in range(teleport.shape[1]):
+            distribution = teleport[:, k] / teleport[:, k].sum()
+            position = rng.choice(pages, size=episodes, p=distribution)
+            remaining = rng.geometric(1 - damping_factor, size=episodes)
+            counts = np.zeros(pages)
+            used = np.zeros(pages, dtype=np.int64)
+            while len(position):
+                segment = self.next_segments(position, used, rng)
+                limit = np.minimum(remaining, self.length)
+                visited = (steps < limit[:, np.newaxis]) & (segment >= 0)
+                counts += np.bincount(segment[visited], minlength=pages)
+                longer = (remaining > self.length) & (segment[:, -1] >= 0)
+                position = segment[longer, -1].astype(np.int64)
+                remaining = remaining[longer] - self.length
+            estimates[:, k] = counts / counts.sum()
+
+        return estimates[:, 0] if vector else estimates
+
+    def next_segments(self, position, used, rng):
+        """
+        Return one segment from each page in `position`, taking the stored
+        walks of a page in order, as counted by `used`, and fresh walks
+        once they are used up.
+        """
+        walks = self.segments.shape[1]
+
+        # Number each occurrence of a page, so repeated pages get
+        # different segments
+        order = np.argsort(position, kind="stable")
+        sorted_position = position[order]
+        first = np.searchsorted(sorted_position, sorted_position)
+        occurrence = np.empty(len(position), dtype=np.int64)
+        occurrence[order] = np.arange(len(position)) - first
+        index = used[position] + occurrence
+        used += np.bincount(position, minlength=len(used))
+
+        stored = index < walks
+        segment = np.empty((len(position), self.length + 1), dtype=np.int32)
+        segment[stored] = self.segments[position[stored], index[stored]]
+        segment[~stored] = self.walk(position[~stored], rng)
+        return segment
+
+
+if __name__ == "__main__":
+    main()